@@ -7,43 +7,134 @@ from __future__ import annotations
 
 import json
 import os
-from typing import Any, Dict, List, Tuple, Optional
+import sys
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 
 from jsonschema import Draft7Validator
 
+try:
+    # Optional: code-generated validator for the fast (first-error) path
+    import fastjsonschema
+    FASTJSONSCHEMA_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    fastjsonschema = None  # type: ignore
+    FASTJSONSCHEMA_AVAILABLE = False
+
+try:
+    # Optional: Rust validator (jsonschema-rs) for full error collection
+    import jsonschema_rs
+    JSONSCHEMA_RS_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    jsonschema_rs = None  # type: ignore
+    JSONSCHEMA_RS_AVAILABLE = False
+
 SCHEMA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'agentfacts-format', 'agentfacts_schema.json'))
 
+# Shared immutable defaults; each record gets its own list copies so callers may mutate them
+_SKILL_DEFAULT_INPUT = ('text',)  # Could derive from taxonomy later
+_SKILL_DEFAULT_OUTPUT = ('text',)
+_AUTH_METHODS_NONE = ('none',)
+
+
 class SchemaLoadError(RuntimeError):
     pass
 
+
+@lru_cache(maxsize=None)
+def _rs_keyword(kind_name: str) -> str:
+    # jsonschema-rs error kinds are CamelCase keywords (MinLength -> minLength)
+    return kind_name[:1].lower() + kind_name[1:]
+
+
+def _make_skill(skill_id: str, description: str) -> Dict[str, Any]:
+    return {
+        'id': skill_id,
+        'description': description,
+        'inputModes': list(_SKILL_DEFAULT_INPUT),
+        'outputModes': list(_SKILL_DEFAULT_OUTPUT),
+    }
+
+
 try:
     # Import SkillMapper from local exporter for taxonomy-based mapping if available
-    from ..batch.export_nanda_to_agntcy import SkillMapper, DEFAULT_OASF_SCHEMA_DIR
+    from ..batch.export_nanda_to_agntcy import SkillMapper, DEFAULT_OASF_SCHEMA_DIR, get_skill_mapper
 except Exception:  # pragma: no cover
     SkillMapper = None  # type: ignore
     DEFAULT_OASF_SCHEMA_DIR = "../agntcy/oasf/schema"
 
 
 class AgentFactsAdapter:
+    __slots__ = ('schema_path', '_skill_mapper', '_skill_mapper_resolved', '_skill_for_capability')
+
+    # Validators are shared by all instances and built on first validation
     _validator: Draft7Validator | None = None
     _schema: Dict[str, Any] | None = None
+    _fast_validate: Any = None
+    _rs_validator: Any = None
+    _init_lock = threading.Lock()
 
     def __init__(self, schema_path: str = SCHEMA_PATH, skill_mapper: Optional[SkillMapper] = None):
         self.schema_path = schema_path
-        if AgentFactsAdapter._schema is None:
-            AgentFactsAdapter._schema = self._load_schema(schema_path)
-        if AgentFactsAdapter._validator is None:
-            AgentFactsAdapter._validator = Draft7Validator(AgentFactsAdapter._schema)
-        # Initialize taxonomy skill mapper if provided or auto-detected
-        self.skill_mapper = skill_mapper
-        if self.skill_mapper is None and SkillMapper is not None:
-            from pathlib import Path
-            schema_dir = Path(DEFAULT_OASF_SCHEMA_DIR)
-            if schema_dir.exists():  # Only build if taxonomy present
+        # Taxonomy mapper is auto-detected lazily on first use unless provided
+        self._skill_mapper = skill_mapper
+        self._skill_mapper_resolved = skill_mapper is not None
+        # Memoize capability -> skill construction; registries repeat the same few capabilities
+        self._skill_for_capability = lru_cache(maxsize=4096)(self._build_skill_for_capability)
+
+    @property
+    def skill_mapper(self) -> Optional[SkillMapper]:
+        if not self._skill_mapper_resolved:
+            with AgentFactsAdapter._init_lock:
+                if not self._skill_mapper_resolved:
+                    self._skill_mapper = self._detect_skill_mapper()
+                    self._skill_mapper_resolved = True
+        return self._skill_mapper
+
+    @skill_mapper.setter
+    def skill_mapper(self, mapper: Optional[SkillMapper]) -> None:
+        self._skill_mapper = mapper
+        self._skill_mapper_resolved = True
+        self._skill_for_capability.cache_clear()
+
+    def _detect_skill_mapper(self) -> Optional[SkillMapper]:
+        if SkillMapper is None:
+            return None
+        from pathlib import Path
+        schema_dir = Path(DEFAULT_OASF_SCHEMA_DIR)
+        if not schema_dir.exists():  # Only build if taxonomy present
+            return None
+        try:
+            return get_skill_mapper(schema_dir)
+        except Exception:
+            return None  # Non-fatal
+
+    def _ensure_validators(self) -> None:
+        """Load the schema and build validators once per process (double-checked under a lock)."""
+        if AgentFactsAdapter._validator is not None:
+            return
+        with AgentFactsAdapter._init_lock:
+            if AgentFactsAdapter._validator is not None:
+                return
+            schema = self._load_schema(self.schema_path)
+            fast_validate = None
+            if FASTJSONSCHEMA_AVAILABLE:
                 try:
-                    self.skill_mapper = SkillMapper(schema_dir)
+                    fast_validate = fastjsonschema.compile(schema)  # in memory only
                 except Exception:
-                    self.skill_mapper = None  # Non-fatal
+                    fast_validate = None  # Non-fatal; Draft7 path still works
+            AgentFactsAdapter._schema = schema
+            rs_validator = None
+            if JSONSCHEMA_RS_AVAILABLE:
+                try:
+                    rs_validator = jsonschema_rs.Draft7Validator(schema)
+                except Exception:
+                    rs_validator = None  # Non-fatal; fall back to Draft7Validator
+            AgentFactsAdapter._fast_validate = fast_validate
+            AgentFactsAdapter._rs_validator = rs_validator
+            # Published last: other threads treat a non-None _validator as "fully initialized"
+            AgentFactsAdapter._validator = Draft7Validator(schema)
 
     def _load_schema(self, path: str) -> Dict[str, Any]:
         if not os.path.exists(path):
@@ -55,16 +146,54 @@ class AgentFactsAdapter:
                 raise SchemaLoadError(f"Invalid JSON in schema file {path}: {e}") from e
 
     # ---------------- Validation -----------------
-    def validate_record(self, record: Dict[str, Any]) -> Tuple[bool, List[Dict[str, Any]]]:
+    def validate_record(self, record: Dict[str, Any], collect_all: bool = False) -> Tuple[bool, List[Dict[str, Any]]]:
         """Validate an AgentFacts record against the schema.
 
         Returns (is_valid, errors). Each error is a dict: {path, message, validator, value}.
+        By default only the first error is reported (using the compiled validator when
+        available); pass collect_all=True to get every error. Errors are collected with
+        jsonschema-rs when installed, otherwise with Draft7Validator.
         """
-        validator = AgentFactsAdapter._validator
+        self._ensure_validators()
+        fast_validate = AgentFactsAdapter._fast_validate
+        if fast_validate is not None and not collect_all:
+            try:
+                fast_validate(record)
+            except fastjsonschema.JsonSchemaValueException as err:
+                # err.path is ['data', 'skills', '0', ...]; drop the root and restore list indices
+                path = [int(p) if p.isdigit() else p for p in err.path[1:]]
+                return (False, [{
+                    'path': path,
+                    'message': err.message,
+                    'validator': err.rule,
+                    'value': err.value,
+                }])
+            return (True, [])
+
         errors: List[Dict[str, Any]] = []
+        rs_validator = AgentFactsAdapter._rs_validator
+        if rs_validator is not None:
+            raw_rs_errors = rs_validator.iter_errors(record)
+            if collect_all:
+                raw_rs_errors = sorted(raw_rs_errors, key=lambda e: e.instance_path)
+            for err in raw_rs_errors:
+                errors.append({
+                    'path': list(err.instance_path),
+                    'message': err.message,
+                    'validator': _rs_keyword(type(err.kind).__name__),
+                    'value': err.instance,
+                })
+                if not collect_all:
+                    break
+            return (len(errors) == 0, errors)
+
+        validator = AgentFactsAdapter._validator
         if validator is None:
             raise SchemaLoadError("Validator not initialized")
-        for err in sorted(validator.iter_errors(record), key=lambda e: e.path):
+        raw_errors = validator.iter_errors(record)
+        if collect_all:
+            raw_errors = sorted(raw_errors, key=lambda e: e.path)
+        for err in raw_errors:
             path = list(err.absolute_path)
             errors.append({
                 'path': path,
@@ -72,8 +201,34 @@ class AgentFactsAdapter:
                 'validator': err.validator,
                 'value': err.instance,
             })
+            if not collect_all:
+                break
         return (len(errors) == 0, errors)
 
+    def is_valid(self, record: Dict[str, Any]) -> bool:
+        """Return True if the record is valid, stopping at the first error without building error dicts."""
+        self._ensure_validators()
+        fast_validate = AgentFactsAdapter._fast_validate
+        if fast_validate is not None:
+            try:
+                fast_validate(record)
+            except fastjsonschema.JsonSchemaValueException:
+                return False
+            return True
+        rs_validator = AgentFactsAdapter._rs_validator
+        if rs_validator is not None:
+            return rs_validator.is_valid(record)
+        validator = AgentFactsAdapter._validator
+        if validator is None:
+            raise SchemaLoadError("Validator not initialized")
+        return next(validator.iter_errors(record), None) is None
+
+    def validate_records(self, records: Iterable[Dict[str, Any]], collect_all: bool = False) -> Iterator[Tuple[bool, List[Dict[str, Any]]]]:
+        """Validate a batch of records lazily, yielding (is_valid, errors) per record in input order."""
+        validate = self.validate_record  # hoisted bound method for the loop
+        for record in records:
+            yield validate(record, collect_all)
+
     # ---------------- Conversion -----------------
     def registry_to_record(self, agent: Dict[str, Any]) -> Dict[str, Any]:
         """Convert a Nanda registry agent entry into an AgentFacts record.
@@ -106,53 +261,34 @@ class AgentFactsAdapter:
         # Capabilities: expect list of strings or richer objects.
         raw_caps = agent.get('capabilities') or []
         modalities: List[str] = []
+        # Capability strings repeat across agents; intern them so records share one object per value
         for c in raw_caps:
             if isinstance(c, str):
-                modalities.append(c)
+                modalities.append(sys.intern(c))
             elif isinstance(c, dict):
                 # Support object with 'name' or 'id'
                 name = c.get('name') or c.get('id')
                 if name:
-                    modalities.append(str(name))
+                    modalities.append(sys.intern(str(name)))
+        modalities = modalities or ['text']  # fallback modality
         # Basic capability structure required by schema.
         capabilities_obj = {
-            'modalities': modalities or ['text'],  # fallback modality
-            'authentication': {
-                'methods': ['none']
-            }
+            'modalities': modalities,
+            'authentication': {'methods': list(_AUTH_METHODS_NONE)},
         }
 
         # Skills: map capabilities via taxonomy SkillMapper if available; fallback to placeholders.
         skills: List[Dict[str, Any]] = []
         if self.skill_mapper:
             seen = set()
-            for cap in modalities or ['text']:
-                mapped = self.skill_mapper.map_capability(cap)
-                if mapped and mapped['skill_id'] not in seen:
-                    # Convert exporter mapping payload to AgentFacts skill shape
-                    skills.append({
-                        'id': mapped['skill_id'],
-                        'description': f"Skill mapped from capability '{cap}' (class: {mapped.get('class_name')})",
-                        'inputModes': ['text'],  # Could derive from taxonomy later
-                        'outputModes': ['text']
-                    })
-                    seen.add(mapped['skill_id'])
+            for cap in modalities:
+                built = self._skill_for_capability(cap)
+                if built and built[0] not in seen:
+                    skills.append(_make_skill(*built))
+                    seen.add(built[0])
         if not skills:
             # Fallback placeholder conversion
-            for m in modalities or ['text']:
-                skills.append({
-                    'id': f"skill:{m}",
-                    'description': f"Capability skill for {m}",
-                    'inputModes': ['text'],
-                    'outputModes': ['text']
-                })
-            if not skills:
-                skills = [{
-                    'id': 'skill:placeholder',
-                    'description': 'Placeholder skill',
-                    'inputModes': ['text'],
-                    'outputModes': ['text']
-                }]
+            skills = [_make_skill(sys.intern(f"skill:{m}"), f"Capability skill for {m}") for m in modalities]
 
         record: Dict[str, Any] = {
             'id': str(agent_id),
@@ -167,6 +303,14 @@ class AgentFactsAdapter:
         }
         return record
 
+    def _build_skill_for_capability(self, cap: str) -> Optional[Tuple[str, str]]:
+        """Map a capability to an immutable (skill_id, description) pair, or None if unmapped."""
+        mapped = self.skill_mapper.map_capability(cap) if self.skill_mapper else None
+        if not mapped:
+            return None
+        # Convert exporter mapping payload to AgentFacts skill shape
+        return (mapped['skill_id'], f"Skill mapped from capability '{cap}' (class: {mapped.get('class_name')})")
+
     def record_to_registry(self, record: Dict[str, Any]) -> Dict[str, Any]:
         """Convert AgentFacts record into minimal Nanda registry entry shape.
 
@@ -189,11 +333,14 @@ class AgentFactsAdapter:
 
 # Convenience singleton accessor
 _adapter_instance: AgentFactsAdapter | None = None
+_adapter_lock = threading.Lock()
 
 def get_adapter() -> AgentFactsAdapter:
     global _adapter_instance
     if _adapter_instance is None:
-        _adapter_instance = AgentFactsAdapter()
+        with _adapter_lock:
+            if _adapter_instance is None:
+                _adapter_instance = AgentFactsAdapter()
     return _adapter_instance
 
 __all__ = [
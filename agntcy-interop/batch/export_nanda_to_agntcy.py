@@ -4,12 +4,45 @@ Moved to agntcy-interop/ to keep root cleaner. See README in this folder.
 """
 from __future__ import annotations
 import argparse
+import contextlib
+import importlib.util
 import json
+import multiprocessing
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import BinaryIO, Dict, Any, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime, timezone
-import requests
+import httpx
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:
+    # Optional: only needed for --zstd NDJSON output
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+# Both parsers accept bytes, which skips a UTF-8 decode before parsing
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _json_dumps_pretty(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+
+def _json_dumps_compact(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
 
 DEFAULT_REGISTRY_URL = os.environ.get("REGISTRY_URL", "http://localhost:6900")
 DEFAULT_OASF_SCHEMA_DIR = os.environ.get("OASF_SCHEMA_DIR", "../agntcy/oasf/schema")
@@ -17,8 +50,59 @@ DEFAULT_OASF_SCHEMA_DIR = os.environ.get("OASF_SCHEMA_DIR", "../agntcy/oasf/sche
 GIT_TAXONOMY_REPO = os.environ.get("OASF_SCHEMA_GIT_REPO", "https://github.com/agntcy/oasf.git")
 GIT_TAXONOMY_REF = os.environ.get("OASF_SCHEMA_GIT_REF", "main")
 ENABLE_GIT_CLONE = os.environ.get("OASF_SCHEMA_GIT_CLONE", "1") == "1"
+DEFAULT_FETCH_WORKERS = 16
+# HTTP/2 needs the optional 'h2' package (httpx[http2]); otherwise stay on HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
 
 # ---------------- Enhanced Skill Mapping Support -----------------
+# Capability normalization: space/dash -> underscore. bytes.translate is a single C loop,
+# far cheaper than str.translate with a dict table, so ASCII input takes the bytes path.
+_CAP_NORM_BYTES = bytes.maketrans(b' -', b'__')
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+# Separator runs dropped to build the variant key ('Text-Classification' / 'text__classification' -> 'textclassification')
+_SEP_RE = re.compile(r'[_\-\s]+')
+# Caption tokens are also indexed by their prefixes of at least this length
+_MIN_PREFIX_LEN = 4
+# Only these skill fields are read after load; descriptions/attributes/observables are dropped
+_SKILL_HOT_FIELDS = ('name', 'caption', 'extends', 'uid')
+# Heuristic fallbacks (needle -> target skill), checked in priority order
+_CAPABILITY_RULES = (
+    ('chat', 'natural_language_generation'),
+    ('conversation', 'natural_language_generation'),
+    ('classif', 'text_classification'),
+    ('retriev', 'information_retrieval_synthesis'),
+    ('search', 'information_retrieval_synthesis'),
+    ('vision', 'image_classification'),
+    ('image', 'image_classification'),
+    ('tool', 'tool_use_planning'),
+)
+
+
+def _normalize_capability(capability: str) -> str:
+    if capability.isascii():
+        return capability.encode('ascii').lower().strip().translate(_CAP_NORM_BYTES).decode('ascii')
+    return capability.lower().strip().replace(' ', '_').replace('-', '_')
+
+
+def _iter_skill_files(skills_root: str, _depth: int = 0):
+    """Yield skill JSON file paths under category directories using os.scandir.
+
+    Files directly under skills_root are skipped (only category dirs hold skills);
+    symlinked directories are not followed, matching Path.rglob.
+    """
+    try:
+        with os.scandir(skills_root) as it:
+            entries = list(it)
+    except OSError as e:
+        print(f"[WARN] Failed scanning {skills_root}: {e}")
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _iter_skill_files(entry.path, _depth + 1)
+        elif _depth > 0 and entry.name.endswith('.json') and entry.is_file():
+            yield entry.path
+
+
 class SkillMapper:
     def __init__(self, schema_dir: Path):
         # If local directory missing and cloning enabled, attempt git clone of taxonomy repo
@@ -29,8 +113,18 @@ class SkillMapper:
         self.skills: Dict[str, Dict[str, Any]] = {}
         self.leaf_skills: Dict[str, Dict[str, Any]] = {}
         self.children: Dict[str, List[str]] = {}
+        # caption token / token prefix -> positions in _leaf_names
+        self._caption_token_index: Dict[str, FrozenSet[int]] = {}
+        self._leaf_names: List[str] = []
+        # separator-free lowercase leaf name -> leaf (first leaf wins on collisions)
+        self._leaf_by_compact_name: Dict[str, Dict[str, Any]] = {}
+        # skill name -> resolved category/class payload (built once per load)
+        self._payload_cache: Dict[str, Dict[str, Any]] = {}
         self._load()
         self._compute_leaves()
+        self._rules_re = self._compile_rules()
+        # Taxonomy is immutable after load, so memoize per instance (most agents reuse a handful of capabilities)
+        self._map_cached = lru_cache(maxsize=4096)(self._map_capability)
 
     def _attempt_clone(self):
         try:
@@ -53,7 +147,7 @@ class SkillMapper:
         cat_file = self.schema_dir / 'skill_categories.json'
         if cat_file.exists():
             try:
-                data = json.loads(cat_file.read_text(encoding='utf-8'))
+                data = _json_loads(cat_file.read_bytes())
                 for k, v in data.get('attributes', {}).items():
                     self.categories[k] = v
             except Exception as e:
@@ -61,56 +155,107 @@ class SkillMapper:
         skills_root = self.schema_dir / 'skills'
         if not skills_root.exists():
             return
-        for category_dir in skills_root.iterdir():
-            if not category_dir.is_dir():
-                continue
-            for json_file in category_dir.rglob('*.json'):
-                try:
-                    obj = json.loads(json_file.read_text(encoding='utf-8'))
-                    name = obj.get('name')
-                    if not name:
-                        continue
-                    self.skills[name] = obj
-                    parent = obj.get('extends')
-                    if isinstance(parent, str):
-                        self.children.setdefault(parent, []).append(name)
-                except Exception as e:
-                    print(f"[WARN] Failed loading skill {json_file}: {e}")
+        for json_file in _iter_skill_files(str(skills_root)):
+            try:
+                with open(json_file, 'rb') as f:
+                    obj = _json_loads(f.read())
+                name = obj.get('name')
+                if not name:
+                    continue
+                self.skills[name] = {k: obj[k] for k in _SKILL_HOT_FIELDS if k in obj}
+                parent = obj.get('extends')
+                if isinstance(parent, str):
+                    self.children.setdefault(parent, []).append(name)
+            except Exception as e:
+                print(f"[WARN] Failed loading skill {json_file}: {e}")
 
     def _compute_leaves(self):
         parent_set = set(self.children.keys())
         for name, obj in self.skills.items():
             if name not in parent_set or not self.children.get(name):
                 self.leaf_skills[name] = obj
+                self._leaf_by_compact_name.setdefault(_SEP_RE.sub('', name.lower()), obj)
+        self._build_caption_index()
+        # Resolve every extends chain up front so mapping never walks the hierarchy per lookup
+        self._payload_cache = {name: self._resolve_payload(obj) for name, obj in self.skills.items()}
+
+    def _build_caption_index(self):
+        postings: Dict[str, List[int]] = {}
+        for position, (name, leaf) in enumerate(self.leaf_skills.items()):
+            self._leaf_names.append(name)
+            caption = (leaf.get('caption') or '').lower()
+            keys = set()
+            for token in _TOKEN_RE.findall(caption):
+                keys.add(token)
+                keys.update(token[:i] for i in range(_MIN_PREFIX_LEN, len(token)))
+            for key in keys:
+                postings.setdefault(key, []).append(position)
+        # Frozen once so lookups intersect prebuilt sets instead of copying lists per call
+        self._caption_token_index = {key: frozenset(positions) for key, positions in postings.items()}
+
+    def _compile_rules(self):
+        """Compile the fallback rules whose target exists into one anchored regex.
+
+        Each target is a lookahead alternative named after the target skill, tried in
+        rule order, so the first applicable rule wins exactly as in a sequential scan.
+        """
+        needles_by_target: Dict[str, List[str]] = {}
+        for needle, target in _CAPABILITY_RULES:
+            if target in self.skills:
+                needles_by_target.setdefault(target, []).append(re.escape(needle))
+        if not needles_by_target:
+            return None
+        alternatives = '|'.join(
+            f"(?=.*?(?P<{target}>{'|'.join(needles)}))" for target, needles in needles_by_target.items()
+        )
+        return re.compile(f"^(?:{alternatives})", re.DOTALL)
+
+    def _match_caption(self, cap_norm: str) -> Optional[Dict[str, Any]]:
+        """Return the first leaf whose caption contains every capability token (as a word or word prefix)."""
+        index = self._caption_token_index
+        tokens = _TOKEN_RE.findall(cap_norm)
+        if not tokens:
+            return None
+        candidates = index.get(tokens[0])
+        for token in tokens[1:]:
+            if not candidates:
+                break
+            candidates = candidates & index.get(token, frozenset())
+        if not candidates:
+            return None
+        # Lowest position == earliest leaf in taxonomy order
+        return self.leaf_skills[self._leaf_names[min(candidates)]]
 
     def map_capability(self, capability: str) -> Optional[Dict[str, Any]]:
-        cap_norm = capability.lower().strip().replace(' ', '_').replace('-', '_')
+        mapped = self._map_cached(capability)
+        # Hand out a copy so callers can't mutate the cached payload
+        return dict(mapped) if mapped else None
+
+    def _map_capability(self, capability: str) -> Optional[Dict[str, Any]]:
+        cap_norm = _normalize_capability(capability)
         if cap_norm in self.leaf_skills:
             return self._payload(self.leaf_skills[cap_norm])
-        for leaf in self.leaf_skills.values():
-            caption = (leaf.get('caption') or '').lower()
-            if cap_norm in caption:
-                return self._payload(leaf)
-        rules = [
-            ('chat', 'natural_language_generation'),
-            ('conversation', 'natural_language_generation'),
-            ('classif', 'text_classification'),
-            ('retriev', 'information_retrieval_synthesis'),
-            ('search', 'information_retrieval_synthesis'),
-            ('vision', 'image_classification'),
-            ('image', 'image_classification'),
-            ('tool', 'tool_use_planning'),
-        ]
-        for needle, target in rules:
-            if needle in cap_norm and target in self.skills:
-                cand = self.skills[target]
-                if target not in self.leaf_skills and self.children.get(target):
-                    child = self.children[target][0]
-                    cand = self.skills.get(child, cand)
-                return self._payload(cand)
+        leaf = self._leaf_by_compact_name.get(_SEP_RE.sub('', cap_norm))
+        if leaf is not None:
+            return self._payload(leaf)
+        leaf = self._match_caption(cap_norm)
+        if leaf is not None:
+            return self._payload(leaf)
+        m = self._rules_re.search(cap_norm) if self._rules_re is not None else None
+        if m:
+            target = m.lastgroup
+            cand = self.skills[target]
+            if target not in self.leaf_skills and self.children.get(target):
+                child = self.children[target][0]
+                cand = self.skills.get(child, cand)
+            return self._payload(cand)
         return None
 
     def _payload(self, leaf: Dict[str, Any]):
+        cached = self._payload_cache.get(leaf.get('name'))
+        return cached if cached is not None else self._resolve_payload(leaf)
+
+    def _resolve_payload(self, leaf: Dict[str, Any]):
         chain = []
         cur = leaf
         seen = set()
@@ -137,27 +282,72 @@ class SkillMapper:
             'class_uid': leaf.get('uid', 0)
         }
 
+def _schema_signature(schema_dir: str) -> Tuple[int, ...]:
+    """mtimes of the schema root, skill_categories.json, skills/ and each category directory.
+
+    Adding, removing or renaming a skill file bumps its category directory's mtime, so this
+    catches taxonomy changes with one scandir of skills/ instead of a full walk.
+    """
+    stamps = []
+    for path in (schema_dir, os.path.join(schema_dir, 'skill_categories.json')):
+        try:
+            stamps.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    skills_root = os.path.join(schema_dir, 'skills')
+    try:
+        stamps.append(os.stat(skills_root).st_mtime_ns)
+        with os.scandir(skills_root) as it:
+            stamps.extend(sorted(e.stat(follow_symlinks=False).st_mtime_ns for e in it if e.is_dir(follow_symlinks=False)))
+    except OSError:
+        pass
+    return tuple(stamps)
+
+
+@lru_cache(maxsize=4)
+def _cached_skill_mapper(schema_dir: str, signature: Tuple[int, ...]) -> SkillMapper:
+    return SkillMapper(Path(schema_dir))
+
+
+def get_skill_mapper(schema_dir: Path) -> SkillMapper:
+    """Return a shared SkillMapper for schema_dir, rebuilt when the taxonomy directories change."""
+    path = str(Path(schema_dir).resolve())
+    return _cached_skill_mapper(path, _schema_signature(path))
+
 # ---------------- Registry fetch helpers -----------------
+# Shared client (thread-safe) so agent fetches reuse pooled / multiplexed connections
+_client = httpx.Client(
+    http2=HTTP2_AVAILABLE,
+    timeout=10.0,
+    verify=False,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+)
+
 
-def fetch_agent_ids(registry_url: str) -> List[str]:
-    resp = requests.get(f"{registry_url}/list", timeout=10, verify=False)
+def fetch_agent_ids(registry_url: str, client: Optional[httpx.Client] = None) -> List[str]:
+    resp = (client or _client).get(f"{registry_url}/list")
     resp.raise_for_status()
-    data = resp.json()
+    data = _json_loads(resp.content)
     return list(data.keys())
 
 
-def fetch_agent(registry_url: str, agent_id: str) -> Optional[Dict[str, Any]]:
-    resp = requests.get(f"{registry_url}/agents/{agent_id}", timeout=10, verify=False)
+def fetch_agent(registry_url: str, agent_id: str, client: Optional[httpx.Client] = None) -> Optional[Dict[str, Any]]:
+    resp = (client or _client).get(f"{registry_url}/agents/{agent_id}")
     if resp.status_code == 200:
-        return resp.json()
+        return _json_loads(resp.content)
     return None
 
 
+# api_url scheme written by sync_agntcy_dir for MCP runtimes: cmd://<command>?args=<space separated args>
+_CMD_URL_PREFIX = 'cmd://'
+_MCP_EXTENSION_NAME = 'schema.oasf.agntcy.org/features/runtime/mcp'
+_MCP_EXTENSION_VERSION = 'v1.0.0'
+
+
 def parse_agent_id(agent_id: str) -> Tuple[str, str]:
-    if ':' in agent_id:
-        parts = agent_id.rsplit(':', 1)
-        return parts[0], parts[1]
-    return agent_id, 'v0'
+    # rpartition scans once and returns a tuple (no list from rsplit)
+    name, sep, version = agent_id.rpartition(':')
+    return (name, version) if sep else (agent_id, 'v0')
 
 
 def build_description(agent: Dict[str, Any]) -> str:
@@ -184,21 +374,13 @@ def build_locators(agent: Dict[str, Any]) -> List[Dict[str, str]]:
 
 def build_mcp_extension(agent: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     api_url = agent.get('api_url') or ''
-    if not api_url.startswith('cmd://'):
+    if not api_url.startswith(_CMD_URL_PREFIX):
         return None
-    try:
-        after = api_url[len('cmd://'):]
-        if '?args=' in after:
-            command, arg_str = after.split('?args=', 1)
-            args = arg_str.split() if arg_str else []
-        else:
-            command, args = after, []
-    except Exception:
-        command, args = api_url, []
+    command, _, arg_str = api_url[len(_CMD_URL_PREFIX):].partition('?args=')
     return {
-        'name': 'schema.oasf.agntcy.org/features/runtime/mcp',
-        'version': 'v1.0.0',
-        'data': {'servers': {'nanda-export': {'command': command, 'args': args, 'env': {}}}}
+        'name': _MCP_EXTENSION_NAME,
+        'version': _MCP_EXTENSION_VERSION,
+        'data': {'servers': {'nanda-export': {'command': command, 'args': arg_str.split(), 'env': {}}}}
     }
 
 
@@ -230,27 +412,114 @@ def agent_to_oasf_record(agent: Dict[str, Any], mapper: Optional[SkillMapper] =
     return record
 
 
-def export_agents(registry_url: str, out_dir: Path, agent_ids: List[str], dry_run: bool, limit: Optional[int], mapper: Optional[SkillMapper]) -> int:
-    exported = 0
-    if limit is not None:
-        agent_ids = agent_ids[:limit]
-    out_dir.mkdir(parents=True, exist_ok=True)
-    for aid in agent_ids:
-        agent = fetch_agent(registry_url, aid)
+def _open_ndjson_stream(path: Path, compress: bool):
+    """Open a single buffered binary stream for NDJSON output, optionally zstd-compressed."""
+    if compress and zstandard is None:
+        raise RuntimeError("--zstd requires the 'zstandard' package (pip install zstandard)")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    raw = open(path, 'wb', buffering=1 << 20)
+    if not compress:
+        return raw
+    # Closing the compressor flushes the frame and closes the underlying file
+    return zstandard.ZstdCompressor().stream_writer(raw)
+
+
+def _write_records(records: Iterable[Dict[str, Any]], fp: BinaryIO, json_array: bool = False) -> int:
+    count = 0
+    if json_array:
+        fp.write(b'[')
+    for record in records:
+        data = _json_dumps_compact(record)
+        if json_array:
+            fp.write(b',' + data if count else data)
+        else:
+            fp.write(data + b'\n')
+        count += 1
+    if json_array:
+        fp.write(b']\n')
+    return count
+
+
+def export_stream(agents: Iterable[Dict[str, Any]], fp: BinaryIO, mapper: Optional[SkillMapper] = None, json_array: bool = False) -> int:
+    """Serialize one OASF record per agent straight to a binary stream.
+
+    Writes NDJSON by default, or a single JSON array when json_array is set. Only the
+    record being written is held in memory. Returns the number of records written.
+    """
+    return _write_records((agent_to_oasf_record(agent, mapper=mapper) for agent in agents), fp, json_array)
+
+
+def _fetched_agents(pool: ThreadPoolExecutor, registry_url: str, agent_ids: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (agent_id, agent) in agent_ids order, skipping agents the registry did not return.
+
+    All fetches are submitted up front; a slow agent only holds back the ones after it.
+    """
+    for aid, agent in zip(agent_ids, pool.map(lambda aid: fetch_agent(registry_url, aid), agent_ids)):
         if not agent:
             print(f"[WARN] Agent not found: {aid}")
             continue
-        record = agent_to_oasf_record(agent, mapper=mapper)
-        filename = f"{record['name'].replace('/', '-')}.record.json"
-        if dry_run:
-            print(f"[DRY] Would write {filename}:\n" + json.dumps(record, indent=2))
-            exported += 1
-            continue
-        path = out_dir / filename
-        with path.open('w', encoding='utf-8') as f:
-            json.dump(record, f, indent=2)
-        print(f"[OK] Exported {aid} -> {path}")
-        exported += 1
+        yield aid, agent
+
+
+# Per-process mapper for --processes workers (built once by the pool initializer)
+_worker_mapper: Optional[SkillMapper] = None
+
+
+def _init_record_worker(schema_dir: Optional[str]) -> None:
+    global _worker_mapper
+    _worker_mapper = get_skill_mapper(Path(schema_dir)) if schema_dir else None
+
+
+def _build_record_in_worker(agent: Dict[str, Any]) -> Dict[str, Any]:
+    return agent_to_oasf_record(agent, mapper=_worker_mapper)
+
+
+def _iter_records(pairs: Iterable[Tuple[str, Dict[str, Any]]], mapper: Optional[SkillMapper], processes: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (agent_id, record), building records in a process pool when processes > 1."""
+    if processes <= 1:
+        for aid, agent in pairs:
+            yield aid, agent_to_oasf_record(agent, mapper=mapper)
+        return
+    pairs = list(pairs)
+    schema_dir = str(mapper.schema_dir) if mapper is not None else None
+    chunksize = max(1, min(256, len(pairs) // (processes * 4)))
+    # spawn, not fork: the fetch threads and pooled HTTP client are live in this process
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_record_worker, initargs=(schema_dir,)) as ex:
+        records = ex.map(_build_record_in_worker, [agent for _, agent in pairs], chunksize=chunksize)
+        for (aid, _), record in zip(pairs, records):
+            yield aid, record
+
+
+def export_agents(registry_url: str, out_dir: Path, agent_ids: List[str], dry_run: bool, limit: Optional[int], mapper: Optional[SkillMapper], workers: int = DEFAULT_FETCH_WORKERS, ndjson_out: Optional[Path] = None, zstd: bool = False, processes: int = 0) -> int:
+    exported = 0
+    if limit is not None:
+        agent_ids = agent_ids[:limit]
+    if ndjson_out is not None and not dry_run:
+        stream_ctx = _open_ndjson_stream(ndjson_out, zstd)
+    else:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stream_ctx = contextlib.nullcontext()
+    # Fetches overlap on the pool; file writes stay on this thread (records too, unless processes > 1)
+    with stream_ctx as stream, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        records = _iter_records(_fetched_agents(pool, registry_url, agent_ids), mapper, processes)
+        if stream is not None:
+            # One record per line; no per-agent open/close or log line
+            exported = _write_records((record for _, record in records), stream)
+        else:
+            for aid, record in records:
+                filename = f"{record['name'].replace('/', '-')}.record.json"
+                if dry_run:
+                    print(f"[DRY] Would write {filename}:\n" + _json_dumps_pretty(record).decode('utf-8'))
+                    exported += 1
+                    continue
+                path = out_dir / filename
+                with path.open('wb') as f:
+                    f.write(_json_dumps_pretty(record))
+                print(f"[OK] Exported {aid} -> {path}")
+                exported += 1
+    if ndjson_out is not None and not dry_run:
+        print(f"[OK] Wrote {exported} records to {ndjson_out}")
     return exported
 
 
@@ -263,7 +532,13 @@ def main():
     parser.add_argument('--dry-run', action='store_true')
     parser.add_argument('--oasf-schema-dir', default=DEFAULT_OASF_SCHEMA_DIR, help='Path to OASF schema root for skill mapping')
     parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=DEFAULT_FETCH_WORKERS, help='Concurrent agent fetches')
+    parser.add_argument('--ndjson-out', help='Write all records as NDJSON to this single file instead of one file per agent')
+    parser.add_argument('--zstd', action='store_true', help='Compress --ndjson-out output with zstd (requires zstandard)')
+    parser.add_argument('--processes', type=int, default=0, help='Build records in N worker processes (default: in-process)')
     args = parser.parse_args()
+    if args.zstd and not args.ndjson_out:
+        parser.error('--zstd requires --ndjson-out')
     try:
         if args.agent_id:
             agent_ids = [args.agent_id]
@@ -277,8 +552,10 @@ def main():
         mapper = None
         schema_dir = Path(args.oasf_schema_dir)
         if schema_dir.exists():
-            mapper = SkillMapper(schema_dir)
-        count = export_agents(args.registry_url, Path(args.out_dir), agent_ids, args.dry_run, args.limit, mapper)
+            mapper = get_skill_mapper(schema_dir)
+        count = export_agents(args.registry_url, Path(args.out_dir), agent_ids, args.dry_run, args.limit, mapper, args.workers,
+                              ndjson_out=Path(args.ndjson_out) if args.ndjson_out else None, zstd=args.zstd,
+                              processes=args.processes)
         print(f"[SUMMARY] Exported {count} agent records.")
         return 0 if count > 0 else 1
     except Exception as e:
@@ -14,29 +14,66 @@ Flags:
   --registry-url    Base URL of registry (default http://localhost:6900)
   --dry-run         Do not perform POST; just print planned registrations
   --limit           Maximum number of records to process (optional)
+  --workers         Number of records parsed/registered concurrently (default 16)
+  --batch           Register N agents per POST /register {'agents': [...]} (default 1;
+                    falls back to one POST per agent if the registry rejects batches)
 
 Exit Codes:
   0 success; >0 on errors.
 """
 import argparse
+import importlib.util
 import json
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import requests
+from typing import Iterator, Dict, Any, List, Optional
+import httpx
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+# Both parsers accept bytes, which skips a UTF-8 decode before parsing
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _json_dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
 
 DEFAULT_REGISTRY_URL = os.environ.get("REGISTRY_URL", "http://localhost:6900")
+DEFAULT_WORKERS = 16
+
+# HTTP/2 needs the optional 'h2' package (httpx[http2]); otherwise stay on HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+# Extension name fragment marking MCP runtime definitions (api_url source)
+_RUNTIME_MCP = "runtime/mcp"
+
+# Shared client (thread-safe) so registrations reuse pooled / multiplexed connections;
+# the transport retries failed connection attempts
+_client = httpx.Client(
+    timeout=10.0,
+    transport=httpx.HTTPTransport(
+        http2=HTTP2_AVAILABLE,
+        retries=3,
+        limits=httpx.Limits(max_connections=DEFAULT_WORKERS, max_keepalive_connections=DEFAULT_WORKERS),
+    ),
+)
 
 
-def find_record_files(root: Path) -> List[Path]:
-    return list(root.rglob("*.record.json"))
+def find_record_files(root: Path) -> Iterator[Path]:
+    yield from root.rglob("*.record.json")
 
 
 def parse_record(path: Path) -> Optional[Dict[str, Any]]:
     try:
-        with path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        return _json_loads(path.read_bytes())
     except Exception as e:
         print(f"[WARN] Failed to parse {path}: {e}")
         return None
@@ -57,21 +94,18 @@ def derive_agent_fields(record: Dict[str, Any]) -> Dict[str, Any]:
     if not agent_url:
         agent_url = f"placeholder://{agent_id}"  # Fallback placeholder
 
-    # api_url heuristic: look into extensions runtime/mcp for a server command
-    api_url = None
-    for ext in record.get("extensions", []):
-        if "runtime/mcp" in ext.get("name", ""):
-            data = ext.get("data", {})
-            servers = data.get("servers", {})
-            # Pick first server definition to construct a pseudo command descriptor as api_url
-            for _, server_cfg in servers.items():
-                command = server_cfg.get("command")
-                args = server_cfg.get("args", [])
-                if command:
-                    api_url = f"cmd://{command}?args={' '.join(args)}"
-                    break
-            if api_url:
-                break
+    # api_url heuristic: first runtime/mcp server with a command becomes a pseudo command descriptor
+    server_cfg = next(
+        (
+            cfg
+            for ext in record.get("extensions", ())
+            if _RUNTIME_MCP in ext.get("name", "")
+            for cfg in ext.get("data", {}).get("servers", {}).values()
+            if cfg.get("command")
+        ),
+        None,
+    )
+    api_url = f"cmd://{server_cfg['command']}?args={' '.join(server_cfg.get('args', []))}" if server_cfg else None
 
     return {
         "agent_id": agent_id,
@@ -80,9 +114,13 @@ def derive_agent_fields(record: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def register_agent(registry_url: str, payload: Dict[str, Any]) -> bool:
+def register_agent(registry_url: str, payload: Dict[str, Any], client: Optional[httpx.Client] = None) -> bool:
     try:
-        resp = requests.post(f"{registry_url}/register", json=payload, timeout=10)
+        resp = (client or _client).post(
+            f"{registry_url}/register",
+            content=_json_dumps(payload),
+            headers={"content-type": "application/json"},
+        )
         if resp.status_code == 200:
             print(f"[OK] Registered {payload['agent_id']}")
             return True
@@ -94,12 +132,63 @@ def register_agent(registry_url: str, payload: Dict[str, Any]) -> bool:
         return False
 
 
+def register_agents(registry_url: str, payloads: List[Dict[str, Any]], client: Optional[httpx.Client] = None) -> Optional[int]:
+    """Register payloads with one bulk POST. Returns None if the registry does not accept batches."""
+    try:
+        resp = (client or _client).post(
+            f"{registry_url}/register",
+            content=_json_dumps({"agents": payloads}),
+            headers={"content-type": "application/json"},
+        )
+    except Exception as e:
+        print(f"[ERR] Exception registering batch of {len(payloads)}: {e}")
+        return 0
+    if resp.status_code in (400, 404):
+        # Older registries only take single agents (no 'agent_id' -> 400, or no route -> 404)
+        return None
+    if resp.status_code != 200:
+        print(f"[ERR] Failed batch of {len(payloads)} status={resp.status_code} body={resp.text}")
+        return 0
+    for payload in payloads:
+        print(f"[OK] Registered {payload['agent_id']}")
+    return len(payloads)
+
+
+def sync_record(path: Path, registry_url: str, dry_run: bool) -> Optional[bool]:
+    """Parse, derive and register one record file. Returns None if nothing was registered."""
+    record = parse_record(path)
+    if not record:
+        return None
+    payload = derive_agent_fields(record)
+    if dry_run:
+        print(f"[DRY] Would register: {payload}")
+        return None
+    return register_agent(registry_url, payload)
+
+
+def sync_batch(paths: List[Path], registry_url: str) -> int:
+    """Parse and derive a chunk of record files, then register them in one request."""
+    payloads = []
+    for path in paths:
+        record = parse_record(path)
+        if record:
+            payloads.append(derive_agent_fields(record))
+    if not payloads:
+        return 0
+    registered = register_agents(registry_url, payloads)
+    if registered is None:
+        registered = sum(register_agent(registry_url, payload) for payload in payloads)
+    return registered
+
+
 def main():
     parser = argparse.ArgumentParser(description="Sync AGNTCY directory records into Nanda Index registry")
     parser.add_argument("--records-path", required=True, help="Root directory containing *.record.json files")
     parser.add_argument("--registry-url", default=DEFAULT_REGISTRY_URL, help="Base URL of registry")
     parser.add_argument("--dry-run", action="store_true", help="Only print actions without executing")
     parser.add_argument("--limit", type=int, default=None, help="Maximum number of records to process")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of records processed concurrently")
+    parser.add_argument("--batch", type=int, default=1, help="Agents registered per request (bulk /register)")
     args = parser.parse_args()
 
     root = Path(args.records_path)
@@ -107,29 +196,30 @@ def main():
         print(f"[ERROR] Path does not exist: {root}")
         return 2
 
-    files = find_record_files(root)
-    if args.limit is not None:
-        files = files[:args.limit]
+    print(f"[INFO] Scanning {root} for record files")
+
+    # islice stops the directory walk once --limit files have been handed out
+    files = islice(find_record_files(root), args.limit)
+    processed = 0
+    success = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = []
+        if args.batch > 1 and not args.dry_run:
+            while chunk := list(islice(files, args.batch)):
+                futures.append(pool.submit(sync_batch, chunk, args.registry_url))
+                processed += len(chunk)
+        else:
+            for path in files:
+                futures.append(pool.submit(sync_record, path, args.registry_url, args.dry_run))
+                processed += 1
+        for future in as_completed(futures):
+            success += future.result() or 0
 
-    if not files:
+    if not processed:
         print("[INFO] No record files found.")
         return 0
 
-    print(f"[INFO] Found {len(files)} record files under {root}")
-
-    success = 0
-    for path in files:
-        record = parse_record(path)
-        if not record:
-            continue
-        payload = derive_agent_fields(record)
-        if args.dry_run:
-            print(f"[DRY] Would register: {payload}")
-            continue
-        if register_agent(args.registry_url, payload):
-            success += 1
-
-    print(f"[SUMMARY] Registered {success} agents out of {len(files)} processed.")
+    print(f"[SUMMARY] Registered {success} agents out of {processed} processed.")
     return 0 if success > 0 else 1
 
 
@@ -0,0 +1,136 @@
+"""Shared fixtures for interop tests."""
+
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+
+from batch import export_nanda_to_agntcy as export_mod
+
+# Importing registry configures it from the environment: import it here in in-memory
+# mode, with TEST_MODE set for the import only. Mongo-backed modules switch with
+# registry.create_app(test_mode=False) and switch back when they finish.
+with pytest.MonkeyPatch.context() as _mp:
+    _mp.setenv("TEST_MODE", "1")
+    import registry  # noqa: F401
+
+MONGO_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+
+# Assume default schema dir relative path exists
+SCHEMA_DIR = Path(export_mod.DEFAULT_OASF_SCHEMA_DIR)
+
+_mongod = None  # (process, dbpath) of the throwaway mongod started for this session
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pytest_configure(config):
+    """Start a throwaway mongod for the Mongo-backed tests unless MONGODB_URI is already set.
+
+    Runs before test modules are imported; the Mongo-backed modules connect to it through
+    registry.create_app(test_mode=False), which reads MONGODB_URI.
+    The data directory lives on tmpfs when available, keeping journal/checkpoint writes off disk.
+    """
+    global _mongod, MONGO_URI
+    config.addinivalue_line("markers", "mongo: needs a reachable MongoDB at MONGODB_URI")
+    mongod = shutil.which("mongod")
+    if _mongod is not None or os.getenv("MONGODB_URI") or not mongod:
+        return
+    dbpath = tempfile.mkdtemp(prefix="nanda-mongod-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    port = _free_port()
+    proc = subprocess.Popen(
+        [mongod, "--dbpath", dbpath, "--bind_ip", "127.0.0.1", "--port", str(port),
+         "--wiredTigerCacheSizeGB", "0.25", "--quiet"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while proc.poll() is None and time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    else:
+        print("[WARN] Throwaway mongod did not start; Mongo tests use MONGODB_URI/localhost")
+        proc.kill()
+        shutil.rmtree(dbpath, ignore_errors=True)
+        return
+    _mongod = (proc, dbpath)
+    MONGO_URI = os.environ["MONGODB_URI"] = f"mongodb://127.0.0.1:{port}"
+
+
+@lru_cache(maxsize=None)
+def mongo_available(uri):
+    """TCP-probe the MongoDB at uri once per session, however many modules ask."""
+    parts = urlsplit(uri)
+    try:
+        with closing(socket.create_connection((parts.hostname or "localhost", parts.port or 27017), timeout=1)):
+            return True
+    except OSError:
+        return False
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip tests marked `mongo` when MongoDB is unreachable."""
+    mongo_items = [item for item in items if item.get_closest_marker("mongo")]
+    if mongo_items and not mongo_available(MONGO_URI):
+        skip = pytest.mark.skip(reason="MongoDB not available at MONGODB_URI")
+        for item in mongo_items:
+            item.add_marker(skip)
+
+
+def pytest_unconfigure(config):
+    global _mongod
+    if _mongod is None:
+        return
+    proc, dbpath = _mongod
+    _mongod = None
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+    shutil.rmtree(dbpath, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def mapper():
+    """SkillMapper over the real OASF taxonomy, loaded once per test session."""
+    if not SCHEMA_DIR.exists():
+        pytest.skip('OASF schema directory missing; mapping tests skipped')
+    return export_mod.get_skill_mapper(SCHEMA_DIR)
+
+
+@pytest.fixture(scope="session")
+def mongo_client():
+    """One pooled MongoClient shared by every Mongo-backed test module."""
+    pymongo = pytest.importorskip("pymongo")
+    client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000, maxPoolSize=50)
+    # Will raise if cannot connect
+    client.admin.command("ping")
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def clear_collections():
+    """Return a callable that empties the given collections concurrently (one round trip of latency)."""
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        def clear(db, *names):
+            for future in [pool.submit(db[name].delete_many, {}) for name in names]:
+                future.result()
+        yield clear
@@ -1,15 +1,6 @@
 """Tests for AgentFacts adapter validation and conversion."""
 
-import importlib.util
-import pathlib
-
-# Attempt dynamic import of agentfacts_adapter without relying on package name resolution
-_adapter_path = pathlib.Path(__file__).parent.parent / 'adapters' / 'agentfacts_adapter.py'
-_spec = importlib.util.spec_from_file_location('agentfacts_adapter', str(_adapter_path))
-assert _spec is not None and _spec.loader is not None, 'Failed to create spec for agentfacts_adapter'
-_module = importlib.util.module_from_spec(_spec)
-_spec.loader.exec_module(_module)  # type: ignore[attr-defined]
-get_adapter = _module.get_adapter
+from adapters.agentfacts_adapter import get_adapter
 
 
 def test_registry_to_record_minimal_valid():
@@ -75,3 +66,67 @@ def test_round_trip_record_to_registry():
     assert back['id'] == agent['id']
     assert 'text' in back['capabilities']
     assert back['endpoints'] == agent['endpoints']
+
+
+def test_validate_collect_all_reports_every_error():
+    adapter = get_adapter()
+    agent = {
+        'id': 'agent-321',
+        'name': 'MultiErrorAgent',
+        'description': 'Two independent schema violations',
+        'capabilities': ['text'],
+        'endpoints': ['https://api.example.com/v1/invoke']
+    }
+    record = adapter.registry_to_record(agent)
+    record['skills'][0].pop('inputModes', None)
+    record['skills'][0]['latencyBudgetMs'] = -5
+    is_valid, first_only = adapter.validate_record(record)
+    assert not is_valid
+    assert len(first_only) == 1
+    is_valid, errors = adapter.validate_record(record, collect_all=True)
+    assert not is_valid
+    assert {e['validator'] for e in errors} >= {'required', 'minimum'}
+
+
+def test_validate_records_batch_and_is_valid():
+    adapter = get_adapter()
+    good = adapter.registry_to_record({
+        'id': 'agent-batch-1',
+        'name': 'BatchAgent',
+        'description': 'Valid record',
+        'capabilities': ['text'],
+        'endpoints': ['https://api.example.com/v1/invoke']
+    })
+    bad = adapter.registry_to_record({
+        'id': 'agent-batch-2',
+        'name': 'BatchAgent',
+        'description': 'Invalid record',
+        'capabilities': ['text'],
+        'endpoints': ['https://api.example.com/v1/invoke']
+    })
+    bad['skills'][0]['latencyBudgetMs'] = -1
+    results = list(adapter.validate_records([good, bad]))
+    assert [ok for ok, _ in results] == [True, False]
+    assert adapter.is_valid(good)
+    assert not adapter.is_valid(bad)
+
+
+def test_validate_record_tracks_content():
+    adapter = get_adapter()
+    record = adapter.registry_to_record({
+        'id': 'agent-cache-1',
+        'name': 'CacheAgent',
+        'description': 'Validated twice',
+        'capabilities': ['text'],
+        'endpoints': ['https://api.example.com/v1/invoke']
+    })
+    assert adapter.validate_record(record) == (True, [])
+    # Results reflect the record as it is now, and errors are the caller's to mutate
+    record['skills'][0]['latencyBudgetMs'] = -1
+    is_valid, errors = adapter.validate_record(record)
+    assert not is_valid
+    errors[0]['message'] = 'mutated'
+    errors[0]['path'].append('mutated')
+    again = adapter.validate_record(record)[1][0]
+    assert again['message'] != 'mutated'
+    assert 'mutated' not in again['path']
@@ -1,11 +1,4 @@
-import os
-import sys
-import importlib
-
-# Ensure module path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
-export_mod = importlib.import_module('batch.export_nanda_to_agntcy')
+from batch import export_nanda_to_agntcy as export_mod
 
 
 def test_parse_agent_id():
@@ -40,3 +33,69 @@ def test_agent_to_oasf_record_mcp_extension():
     }
     record = export_mod.agent_to_oasf_record(agent_payload)
     assert any(ext['name'].endswith('/runtime/mcp') for ext in record['extensions'])
+
+
+def test_export_agents_fetches_concurrently(tmp_path, monkeypatch):
+    agents = {
+        f'agentm-exp-{i}:v1': {'agent_id': f'agentm-exp-{i}:v1', 'agent_url': f'http://bridge/{i}', 'last_update': '2025-01-01T00:00:00Z'}
+        for i in range(5)
+    }
+    monkeypatch.setattr(export_mod, 'fetch_agent', lambda url, aid, client=None: agents.get(aid))
+    ids = list(agents) + ['agentm-missing:v1']
+    count = export_mod.export_agents('http://registry', tmp_path, ids, dry_run=False, limit=None, mapper=None, workers=4)
+    assert count == 5
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(f'agentm-exp-{i}.record.json' for i in range(5))
+
+
+def test_export_agents_ndjson_stream(tmp_path, monkeypatch):
+    import json
+    import time
+    agents = {
+        f'agentm-nd-{i}:v1': {'agent_id': f'agentm-nd-{i}:v1', 'agent_url': f'http://bridge/{i}', 'last_update': '2025-01-01T00:00:00Z'}
+        for i in range(3)
+    }
+    def fetch(url, aid, client=None):
+        # Earlier agents answer last; output must still follow the input order
+        time.sleep(0.02 * (3 - int(aid.split('-')[2].split(':')[0])))
+        return agents.get(aid)
+
+    monkeypatch.setattr(export_mod, 'fetch_agent', fetch)
+    out = tmp_path / 'records.ndjson'
+    count = export_mod.export_agents('http://registry', tmp_path / 'unused', list(agents), dry_run=False, limit=None, mapper=None, ndjson_out=out, workers=3)
+    assert count == 3
+    lines = out.read_bytes().splitlines()
+    assert [json.loads(line)['name'] for line in lines] == [f'agentm-nd-{i}' for i in range(3)]
+    assert not (tmp_path / 'unused').exists()
+
+
+def test_export_agents_builds_records_in_processes(tmp_path, monkeypatch):
+    import json
+    agents = {
+        f'agentm-proc-{i}:v1': {'agent_id': f'agentm-proc-{i}:v1', 'agent_url': f'http://bridge/{i}', 'api_url': 'cmd://npx?args=-y srv'}
+        for i in range(4)
+    }
+    monkeypatch.setattr(export_mod, 'fetch_agent', lambda url, aid, client=None: agents.get(aid))
+    out = tmp_path / 'records.ndjson'
+    count = export_mod.export_agents('http://registry', tmp_path, list(agents), dry_run=False, limit=None, mapper=None,
+                                     ndjson_out=out, processes=2)
+    assert count == 4
+    records = [json.loads(line) for line in out.read_bytes().splitlines()]
+    assert [r['name'] for r in records] == [f'agentm-proc-{i}' for i in range(4)]
+    assert all(r['extensions'][0]['data']['servers']['nanda-export']['args'] == ['-y', 'srv'] for r in records)
+
+
+def test_export_stream_json_array():
+    import io
+    import json
+    agents = [{'agent_id': f'agentm-arr-{i}:v1', 'agent_url': f'http://bridge/{i}'} for i in range(2)]
+    buf = io.BytesIO()
+    assert export_mod.export_stream(agents, buf, json_array=True) == 2
+    assert [r['name'] for r in json.loads(buf.getvalue())] == ['agentm-arr-0', 'agentm-arr-1']
+    empty = io.BytesIO()
+    assert export_mod.export_stream([], empty, json_array=True) == 0
+    assert json.loads(empty.getvalue()) == []
+
+
+def test_normalize_capability_ascii_and_unicode():
+    assert export_mod._normalize_capability('  Text-Classification Service ') == 'text_classification_service'
+    assert export_mod._normalize_capability('Übersetzung-Dienst') == 'übersetzung_dienst'
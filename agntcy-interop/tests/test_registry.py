@@ -1,23 +1,13 @@
 import os
-import sys
 import pytest
 
-# Ensure project root on path prior to import
-INTEROP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-REPO_ROOT = os.path.abspath(os.path.join(INTEROP_ROOT, os.pardir))  # nanda-index directory
-for p in (INTEROP_ROOT, REPO_ROOT):
-    if p not in sys.path:
-        sys.path.insert(0, p)
-
-# Activate test mode env flag before import
-os.environ.setdefault("TEST_MODE", "1")
-
-from registry import app
+import registry
 
 @pytest.fixture(scope="module")
 def test_client():
     # Use Flask test client
     os.environ["PORT"] = "5001"  # isolate port
+    app = registry.create_app(test_mode=True)
     with app.test_client() as client:
         yield client
 
@@ -41,6 +31,24 @@ def test_register_and_lookup(test_client):
     assert r2.json["api_url"] == payload["api_url"]
 
 
+
+def test_register_batch(test_client):
+    agents = [
+        {"agent_id": f"agentm-batch-{i}", "agent_url": f"https://bridge.local/agentm-batch-{i}", "api_url": None}
+        for i in range(3)
+    ]
+    r = test_client.post("/register", json={"agents": agents})
+    assert r.status_code == 200
+    assert r.json["registered"] == [a["agent_id"] for a in agents]
+    r2 = test_client.get("/lookup/agentm-batch-2")
+    assert r2.status_code == 200
+    assert r2.json["agent_url"] == agents[2]["agent_url"]
+
+    # One malformed entry rejects the whole batch
+    r3 = test_client.post("/register", json={"agents": [{"agent_id": "agentm-batch-bad"}]})
+    assert r3.status_code == 400
+    assert test_client.get("/lookup/agentm-batch-bad").status_code == 404
+
 def test_allocate_agent(test_client):
     # Need at least one available agent. Register two.
     for i in range(2):
@@ -73,3 +81,83 @@ def test_list_endpoints(test_client):
     rc = test_client.get("/clients")
     assert rc.status_code == 200
     assert isinstance(rc.json, dict)
+
+
+def test_allocate_hands_out_each_free_agent_once(test_client):
+    registry.reset_state()
+    for i in range(3):
+        r = test_client.post("/register", json={
+            "agent_id": f"agentm-pool-{i}",
+            "agent_url": f"https://bridge.local/agentm-pool-{i}",
+            "api_url": f"https://api.local/agentm-pool-{i}",
+        })
+        assert r.status_code == 200
+    r = test_client.post("/register", json={
+        "agent_id": "agents-pool-x",
+        "agent_url": "https://bridge.local/agents-pool-x",
+        "api_url": "https://api.local/agents-pool-x",
+    })
+    assert r.status_code == 200
+    assert test_client.delete("/agents/agentm-pool-2").status_code == 200
+
+    allocated = set()
+    for name in ("Pool One", "Pool Two"):
+        r = test_client.post("/api/allocate", json={"client_id": "dummy", "userProfile": {"name": name}})
+        assert r.status_code == 200
+        allocated.add(r.json["message"].split()[1])
+    assert allocated == {"agentm-pool-0", "agentm-pool-1"}
+
+    r = test_client.post("/api/allocate", json={"client_id": "dummy", "userProfile": {"name": "Pool Three"}})
+    assert r.status_code == 503
+
+
+def test_register_without_api_url(test_client):
+    r = test_client.post("/register", json={"agent_id": "agentm-no-api", "agent_url": "https://bridge.local/agentm-no-api"})
+    assert r.status_code == 200
+    assert test_client.get("/agents/agentm-no-api").status_code == 200
+
+
+def test_allocate_skips_agent_deleted_after_take(test_client, monkeypatch):
+    registry.reset_state()
+    for i in range(2):
+        test_client.post("/register", json={
+            "agent_id": f"agentm-race-{i}",
+            "agent_url": f"https://bridge.local/agentm-race-{i}",
+            "api_url": f"https://api.local/agentm-race-{i}",
+        })
+    take = registry._take_free_agent
+    deleted = []
+
+    def take_then_delete():
+        # A concurrent DELETE /agents/<id> drops the agent right after the first take
+        agent_id = take()
+        if not deleted:
+            deleted.append(agent_id)
+            registry.registry.pop(agent_id)
+            registry.registry["agent_status"].pop(agent_id)
+        return agent_id
+
+    monkeypatch.setattr(registry, "_take_free_agent", take_then_delete)
+    r = test_client.post("/api/allocate", json={"client_id": "dummy", "userProfile": {"name": "Race One"}})
+    assert r.status_code == 200
+    assert r.json["message"].split()[1] not in deleted
+
+
+def test_deleted_assigned_agent_is_free_after_reregistering(test_client):
+    registry.reset_state()
+    agent = {
+        "agent_id": "agentm-reuse-1",
+        "agent_url": "https://bridge.local/agentm-reuse-1",
+        "api_url": "https://api.local/agentm-reuse-1",
+    }
+    test_client.post("/register", json=agent)
+    r = test_client.post("/api/allocate", json={"client_id": "dummy", "userProfile": {"name": "Reuse One"}})
+    assert r.status_code == 200
+
+    test_client.delete("/agents/agentm-reuse-1")
+    assert "reuseone" not in test_client.get("/clients").json
+
+    test_client.post("/register", json=agent)
+    r = test_client.post("/api/allocate", json={"client_id": "dummy", "userProfile": {"name": "Reuse Two"}})
+    assert r.status_code == 200
+    assert "agentm-reuse-1" in r.json["message"]
@@ -1,63 +1,28 @@
 import os
-import sys
-import socket
 import pytest
-import importlib
-from contextlib import closing
 
-# Ensure project root on path before importing / reloading registry
-INTEROP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-REPO_ROOT = os.path.abspath(os.path.join(INTEROP_ROOT, os.pardir))
-for p in (INTEROP_ROOT, REPO_ROOT):
-    if p not in sys.path:
-        sys.path.insert(0, p)
-
-# Clear TEST_MODE and force fresh import of registry for Mongo persistence
-os.environ.pop("TEST_MODE", None)
-if 'registry' in sys.modules:
-    del sys.modules['registry']
 import registry
-app = registry.app
-
-MONGO_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-
 
-def mongo_available(host="localhost", port=27017):
-    try:
-        with closing(socket.create_connection((host, port), timeout=1)):
-            return True
-    except OSError:
-        return False
+pytestmark = pytest.mark.mongo
 
-pytestmark = pytest.mark.skipif(not mongo_available(), reason="MongoDB not available on localhost:27017")
-
-try:
-    from pymongo import MongoClient
-except Exception:  # pragma: no cover
-    pytest.skip("pymongo not installed", allow_module_level=True)
-
-@pytest.fixture(scope="module")
-def mongo_client():
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
-    # Will raise if cannot connect
-    client.admin.command("ping")
-    yield client
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    # Switch the shared registry app to MongoDB persistence for this module,
+    # then back to in-memory mode so later modules don't inherit it
+    yield registry.create_app(test_mode=False)
+    registry.create_app(test_mode=True)
 
 @pytest.fixture(scope="module")
-def test_client():
+def test_client(app):
     with app.test_client() as c:
         yield c
 
 @pytest.fixture(autouse=True)
-def cleanup(mongo_client):
+def cleanup(mongo_client, clear_collections):
     """Isolate Mongo data and in-memory registry state per test."""
     db = mongo_client[os.getenv("MONGODB_DB", "iot_agents_db")]
-    db["agent_registry"].delete_many({})
-    db["client_registry"].delete_many({})
-    registry.registry.clear()
-    registry.registry["agent_status"] = {}
-    registry.client_registry.clear()
-    registry.client_registry["agent_map"] = {}
+    clear_collections(db, "agent_registry", "client_registry")
+    registry.reset_state()
 
 
 def test_register_persists(mongo_client, test_client):
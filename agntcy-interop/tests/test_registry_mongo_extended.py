@@ -1,63 +1,33 @@
 import os
-import sys
-import socket
 import pytest
-import importlib
-from contextlib import closing
-
-INTEROP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-REPO_ROOT = os.path.abspath(os.path.join(INTEROP_ROOT, os.pardir))
-for p in (INTEROP_ROOT, REPO_ROOT):
-    if p not in sys.path:
-        sys.path.insert(0, p)
-
-# Force registry reload without TEST_MODE
-os.environ.pop("TEST_MODE", None)
-if 'registry' in sys.modules:
-    del sys.modules['registry']
+
 import registry
-app = registry.app
 
-MONGO_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 DB_NAME = os.getenv("MONGODB_DB", "iot_agents_db")
 
 
-def mongo_available(host="localhost", port=27017):
-    try:
-        with closing(socket.create_connection((host, port), timeout=1)):
-            return True
-    except OSError:
-        return False
-
-pytestmark = pytest.mark.skipif(not mongo_available(), reason="MongoDB not available on localhost:27017")
-
-from pymongo import MongoClient  # noqa: E402
+pytestmark = pytest.mark.mongo
 
-@pytest.fixture(scope="module")
-def mongo_client():
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
-    client.admin.command("ping")
-    yield client
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    # Switch the shared registry app to MongoDB persistence for this module,
+    # then back to in-memory mode so later modules don't inherit it
+    yield registry.create_app(test_mode=False)
+    registry.create_app(test_mode=True)
 
 @pytest.fixture(scope="module")
 def db(mongo_client):
     return mongo_client[DB_NAME]
 
 @pytest.fixture(scope="function", autouse=True)
-def cleanup(db):
+def cleanup(db, clear_collections):
     # Clean relevant collections before each test for isolation
-    db["agent_registry"].delete_many({})
-    db["client_registry"].delete_many({})
-    db["users"].delete_many({})
-    db["mcp_registry"].delete_many({})
+    clear_collections(db, "agent_registry", "client_registry", "users", "mcp_registry")
     # Reset global registries inside registry module
-    registry.registry.clear()
-    registry.registry["agent_status"] = {}
-    registry.client_registry.clear()
-    registry.client_registry["agent_map"] = {}
+    registry.reset_state()
 
-@pytest.fixture(scope="function")
-def client():
+@pytest.fixture(scope="module")
+def client(app):
     with app.test_client() as c:
         yield c
 
@@ -125,6 +95,17 @@ def test_duplicate_signup_fails(client, db):
         assert r2.status_code == 400
 
 
+def test_signup_race_returns_agent_to_free_set(client, db, monkeypatch):
+    register_agent(client, "agentm-signup-race")
+    assert client.post("/api/signup", json={"email": "race@example.com", "username": "race1"}).status_code == 200
+    register_agent(client, "agentm-signup-race-2")
+    # Both signups passed the existence check; the unique email index rejects the second insert
+    monkeypatch.setattr(registry.users_col, "find_one", lambda *a, **k: None)
+    r = client.post("/api/signup", json={"email": "race@example.com", "username": "race2"})
+    assert r.status_code == 400
+    assert "agentm-signup-race-2" in registry._free_agents
+
+
 def test_setup_user_with_specific_agent(client, db):
     # Register specific 'agents' agent
     register_agent(client, "agents-ext-3")
@@ -136,6 +117,16 @@ def test_setup_user_with_specific_agent(client, db):
         assert user_doc.get("agent_id") == "agents-ext-3"
 
 
+def test_delete_removes_persisted_documents(client, db):
+    register_agent(client, "agentm-ext-del")
+    client.post("/api/allocate", json={"client_id": "dummy", "userProfile": {"name": "Deleted Client"}})
+    assert db["agent_registry"].find_one({"agent_id": "agentm-ext-del"}) is not None
+    r = client.delete("/agents/agentm-ext-del")
+    assert r.status_code == 200
+    assert db["agent_registry"].find_one({"agent_id": "agentm-ext-del"}) is None
+    assert db["client_registry"].find_one({"agent_id": "agentm-ext-del"}) is None
+
+
 def test_lookup_not_found(client):
     r = client.get("/lookup/nonexistent")
     assert r.status_code == 404
@@ -153,3 +144,23 @@ def test_clients_endpoint(client):
     r = client.get("/clients")
     assert r.status_code == 200
     assert isinstance(r.json, dict)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_gets_its_own_mongo_client(client):
+    parent_client = registry.mongo_client
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # child: report whether it got a fresh, working client
+        try:
+            ok = registry.mongo_client is not parent_client and registry.agent_registry_col.database.client is registry.mongo_client
+            registry.mongo_client.admin.command("ping")
+            os.write(write_fd, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    result = os.read(read_fd, 1)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    assert result == b"1"
+    assert registry.mongo_client is parent_client
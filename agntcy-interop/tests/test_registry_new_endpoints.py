@@ -1,22 +1,10 @@
-import os
-import sys
-import importlib
 import pytest
 
-# Enable TEST_MODE before importing registry
-os.environ['TEST_MODE'] = '1'
+import registry
 
-interop_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-repo_root = os.path.abspath(os.path.join(interop_root, os.pardir))
-for p in (interop_root, repo_root):
-    if p not in sys.path:
-        sys.path.insert(0, p)
-
-registry_module = importlib.import_module('registry')
-app = registry_module.app
-
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client():
+    app = registry.create_app(test_mode=True)
     with app.test_client() as c:
         yield c
 
@@ -30,6 +18,13 @@ def test_health_endpoint(client):
     assert resp.status_code == 200
     data = resp.get_json()
     assert data['status'] == 'ok'
+    assert data['mongo'] is False
+
+
+def test_ready_endpoint(client):
+    resp = client.get('/ready')
+    assert resp.status_code == 200
+    assert resp.get_json()['status'] == 'ready'
 
 
 def test_stats_counts(client):
@@ -41,6 +36,18 @@ def test_stats_counts(client):
     assert data['total_agents'] >= 2
 
 
+def test_stats_alive_tracks_status_changes(client):
+    register_sample(client, agent_id='agentm-stats-alive')
+    before = client.get('/stats').get_json()['alive_agents']
+    client.put('/agents/agentm-stats-alive/status', json={'alive': True})
+    assert client.get('/stats').get_json()['alive_agents'] == before + 1
+    register_sample(client, agent_id='agentm-stats-alive')  # re-registration resets alive
+    assert client.get('/stats').get_json()['alive_agents'] == before
+    client.put('/agents/agentm-stats-alive/status', json={'alive': True})
+    client.delete('/agents/agentm-stats-alive')
+    assert client.get('/stats').get_json()['alive_agents'] == before
+
+
 def test_agent_get_and_status_update(client):
     register_sample(client, agent_id='agentm-status-1')
     # Update status
@@ -69,6 +76,19 @@ def test_search_filters(client):
     assert any(a['agent_id'] == 'agentm-search-1' for a in r3.get_json())
 
 
+def test_search_index_follows_updates_and_deletes(client):
+    register_sample(client, agent_id='agentm-search-2')
+    client.put('/agents/agentm-search-2/status', json={'capabilities': ['vision'], 'tags': ['beta']})
+    ids = lambda r: [a['agent_id'] for a in r.get_json()]  # noqa: E731
+    assert 'agentm-search-2' in ids(client.get('/search?capabilities=vision,math&tags=beta'))
+    assert 'agentm-search-2' not in ids(client.get('/search?capabilities=vision&tags=alpha'))
+    client.put('/agents/agentm-search-2/status', json={'capabilities': ['audio']})
+    assert 'agentm-search-2' not in ids(client.get('/search?capabilities=vision'))
+    assert 'agentm-search-2' in ids(client.get('/search?capabilities=audio&tags=beta'))
+    client.delete('/agents/agentm-search-2')
+    assert 'agentm-search-2' not in ids(client.get('/search?capabilities=audio'))
+
+
 def test_delete_agent(client):
     register_sample(client, agent_id='agentm-delete-1')
     d = client.delete('/agents/agentm-delete-1')
@@ -85,3 +105,56 @@ def test_mcp_servers_stub(client):
     resp = client.get('/mcp_servers')
     servers = resp.get_json()
     assert any(s['agent_id'] == 'mcp-server-1' for s in servers)
+
+
+def test_setup_rejects_allocatable_agents(client):
+    register_sample(client, agent_id='agentm-setup-1')
+    resp = client.post('/api/setup', json={'email': 'a@example.com', 'username': 'setup1', 'agent_id': 'agentm-setup-1'})
+    assert resp.status_code == 400
+    assert resp.get_json()['message'] == 'Agent cannot be selected for setup'
+
+
+def test_agent_kind_letter_is_case_insensitive(client):
+    register_sample(client, agent_id='agentS1')
+    resp = client.post('/api/setup', json={'email': 's@example.com', 'username': 'setupS', 'agent_id': 'agentS1'})
+    # Passes the kind check; in TEST_MODE it then stops at the missing MongoDB
+    assert resp.get_json()['message'] != 'Agent cannot be selected for setup'
+    register_sample(client, agent_id='agentM-upper')
+    assert registry._is_free('agentM-upper')
+    assert not registry._is_free('agentS1')
+
+
+def test_mcp_registry_cache_and_invalidate(client):
+    url = '/get_mcp_registry?registry_provider=prov&qualified_name=cached'
+    assert client.get(url).status_code == 404
+    registry._cache_mcp(('prov', 'cached'), {'qualified_name': 'cached', 'endpoint': 'http://mcp.local'})
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert resp.get_json()['endpoint'] == 'http://mcp.local'
+
+    inv = client.post('/admin/mcp_cache/invalidate')
+    assert inv.get_json()['invalidated'] == 1
+    assert client.get(url).status_code == 404
+
+
+def test_list_and_clients_follow_changes(client):
+    assert 'agentm-list-1' not in client.get('/list').get_json()
+    register_sample(client, agent_id='agentm-list-1')
+    assert client.get('/list').get_json()['agentm-list-1'] == 'http://example.com/bridge'
+
+    client.post('/api/allocate', json={'client_id': 'dummy', 'userProfile': {'name': 'List Client'}})
+    assert 'listclient' in client.get('/clients').get_json()
+
+    client.delete('/agents/agentm-list-1')
+    assert 'agentm-list-1' not in client.get('/list').get_json()
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/api/allocate', {'client_id': 'dummy'}),
+    ('/api/allocate', {'client_id': 'dummy', 'userProfile': {'name': 7}}),
+    ('/api/check-user', ['not', 'an', 'object']),
+    ('/api/signup', {'email': 'a@example.com', 'username': ''}),
+    ('/api/setup', {'email': 'a@example.com', 'username': 'u'}),
+])
+def test_malformed_bodies_are_rejected(client, path, body):
+    assert client.post(path, json=body).status_code == 400
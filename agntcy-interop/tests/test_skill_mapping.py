@@ -1,49 +1,31 @@
+import json
 import os
-import sys
-import importlib
 from pathlib import Path
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
 
-mod = importlib.import_module('batch.export_nanda_to_agntcy')
+from batch import export_nanda_to_agntcy as mod
 
-# Assume default schema dir relative path exists
-SCHEMA_DIR = Path(mod.DEFAULT_OASF_SCHEMA_DIR)
-
-def skip_if_schema_missing():
-    if not SCHEMA_DIR.exists():
-        import pytest
-        pytest.skip('OASF schema directory missing; mapping tests skipped')
-
-
-def test_exact_match():
-    skip_if_schema_missing()
-    mapper = mod.SkillMapper(SCHEMA_DIR)
+def test_exact_match(mapper):
     # pick a known leaf skill name present: text_classification
     skill = mapper.map_capability('text_classification')
     assert skill is not None
     assert 'class_name' in skill
 
 
-def test_substring_caption_match():
-    skip_if_schema_missing()
-    mapper = mod.SkillMapper(SCHEMA_DIR)
+def test_substring_caption_match(mapper):
     skill = mapper.map_capability('generation')  # expect natural_language_generation
     assert skill is not None
     assert 'Generation' in skill['class_name']
 
 
-def test_fallback_chat():
-    skip_if_schema_missing()
-    mapper = mod.SkillMapper(SCHEMA_DIR)
+def test_fallback_chat(mapper):
     skill = mapper.map_capability('chat-interface')
     assert skill is not None
     assert skill['class_name']
 
 
-def test_agent_record_skills_integration():
-    skip_if_schema_missing()
-    mapper = mod.SkillMapper(SCHEMA_DIR)
+def test_agent_record_skills_integration(mapper):
     agent_payload = {
         'agent_id': 'agentm-demo:v1',
         'agent_url': 'http://bridge/demo',
@@ -55,9 +37,7 @@ def test_agent_record_skills_integration():
     assert len(record['skills']) >= 2
 
 
-def test_agent_record_dedup_skills():
-    skip_if_schema_missing()
-    mapper = mod.SkillMapper(SCHEMA_DIR)
+def test_agent_record_dedup_skills(mapper):
     # Provide duplicate capabilities that should map to same skill
     agent_payload = {
         'agent_id': 'agentm-dedup:v1',
@@ -71,15 +51,11 @@ def test_agent_record_dedup_skills():
     assert len(skill_ids) == len(set(skill_ids)), 'Duplicate skill_id entries present'
 
 
-def test_unknown_capability_returns_none():
-    skip_if_schema_missing()
-    mapper = mod.SkillMapper(SCHEMA_DIR)
+def test_unknown_capability_returns_none(mapper):
     assert mapper.map_capability('incomprehensible_capability_xyz') is None
 
 
-def test_parent_inference_or_no_match():
-    skip_if_schema_missing()
-    mapper = mod.SkillMapper(SCHEMA_DIR)
+def test_parent_inference_or_no_match(mapper):
     # Attempt mapping using a parent skill name if available; choose a known non-leaf if taxonomy supplies it.
     # If taxonomy lacks that parent, tolerant: result may be None.
     possible = mapper.map_capability('natural_language_generation')
@@ -87,16 +63,11 @@ def test_parent_inference_or_no_match():
     assert possible is None or 'skill_id' in possible
 
 
-def test_skills_map_endpoint(monkeypatch):
+def test_skills_map_endpoint(mapper):
     """Integration with /skills/map endpoint via Flask test client using registry internal mapper."""
-    skip_if_schema_missing()
-    # Ensure TEST_MODE so registry uses in-memory
-    monkeypatch.setenv('TEST_MODE', '1')
-    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', os.pardir))
-    if repo_root not in sys.path:
-        sys.path.insert(0, repo_root)
-    import registry  # noqa: E402
-    app = registry.app
+    import registry
+    # In-memory registry (no MongoDB)
+    app = registry.create_app(test_mode=True)
     with app.test_client() as client:
         resp = client.get('/skills/map?capability=text_classification')
         assert resp.status_code in (200, 500, 404)  # 500 if mapper init failed, 404 if not found
@@ -109,3 +80,72 @@ def test_skills_map_endpoint(monkeypatch):
         else:
             # If error, give diagnostic for test logs
             _ = resp.get_json()
+
+
+def _write_mini_taxonomy(root: Path) -> Path:
+    """Write a tiny OASF-like taxonomy so mapper behavior can be tested without the real schema."""
+    schema_dir = root / 'schema'
+    nlp_dir = schema_dir / 'skills' / 'natural_language_processing'
+    nlp_dir.mkdir(parents=True)
+    (schema_dir / 'skill_categories.json').write_text(json.dumps({
+        'attributes': {'natural_language_processing': {'caption': 'Natural Language Processing', 'uid': 1}}
+    }))
+    skills = [
+        {'name': 'natural_language_processing', 'caption': 'Natural Language Processing', 'extends': 'base_skill', 'uid': 1},
+        {'name': 'natural_language_generation', 'caption': 'Natural Language Generation', 'extends': 'natural_language_processing', 'uid': 102},
+        {'name': 'text_classification', 'caption': 'Text Classification', 'extends': 'natural_language_processing', 'uid': 103},
+    ]
+    for skill in skills:
+        (nlp_dir / f"{skill['name']}.json").write_text(json.dumps(skill))
+    return schema_dir
+
+
+@pytest.fixture(scope='module')
+def mini_mapper(tmp_path_factory):
+    """SkillMapper over the mini taxonomy, built once for the read-only tests below."""
+    return mod.SkillMapper(_write_mini_taxonomy(tmp_path_factory.mktemp('mini')))
+
+
+def test_map_capability_cached_payload_is_copied(mini_mapper):
+    first = mini_mapper.map_capability('text_classification')
+    assert first is not None and first['skill_id'] == 'text_classification'
+    first['skill_id'] = 'mutated'
+    again = mini_mapper.map_capability('text_classification')
+    assert again['skill_id'] == 'text_classification'
+    assert mini_mapper._map_cached.cache_info().hits >= 1
+
+
+def test_caption_token_and_prefix_match(mini_mapper):
+    assert mini_mapper.map_capability('generation')['skill_id'] == 'natural_language_generation'
+    assert mini_mapper.map_capability('Text Classif')['skill_id'] == 'text_classification'
+    assert mini_mapper.map_capability('language')['skill_id'] == 'natural_language_generation'
+    assert mini_mapper.map_capability('lan') is None
+
+
+def test_separator_variants_hit_leaf_name_table(mini_mapper):
+    for variant in ('TextClassification', 'text__classification', 'Text -  Classification'):
+        assert mini_mapper.map_capability(variant)['skill_id'] == 'text_classification'
+
+
+def test_fallback_rules_follow_rule_priority(mini_mapper):
+    # 'chat' outranks 'tool' even though 'tool' appears first in the capability
+    assert mini_mapper.map_capability('tool-chat')['skill_id'] == 'natural_language_generation'
+    assert mini_mapper.map_capability('spam classifier')['skill_id'] == 'text_classification'
+    # tool_use_planning is absent from the mini taxonomy, so its rule is skipped
+    assert mini_mapper.map_capability('toolbox') is None
+
+
+def test_get_skill_mapper_shared_until_schema_changes(tmp_path):
+    schema_dir = _write_mini_taxonomy(tmp_path)
+    first = mod.get_skill_mapper(schema_dir)
+    assert mod.get_skill_mapper(schema_dir) is first
+    os.utime(schema_dir, ns=(1, 1))  # simulate the taxonomy directory changing
+    assert mod.get_skill_mapper(schema_dir) is not first
+    second = mod.get_skill_mapper(schema_dir)
+    (schema_dir / 'skills' / 'natural_language_processing' / 'summarization.json').write_text(json.dumps(
+        {'name': 'summarization', 'caption': 'Summarization', 'extends': 'natural_language_processing', 'uid': 104}))
+    nlp_dir = schema_dir / 'skills' / 'natural_language_processing'
+    os.utime(nlp_dir, ns=(2, 2))  # a new skill file bumps its category directory
+    third = mod.get_skill_mapper(schema_dir)
+    assert third is not second
+    assert third.map_capability('summarization')['skill_id'] == 'summarization'
@@ -1,65 +1,187 @@
 # registry.py
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 import os
 import random
+import ssl
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from flask_cors import CORS
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from pathlib import Path
 import json
 
-TEST_MODE = os.getenv("TEST_MODE") == "1"
+try:
+    from pymongo import MongoClient, UpdateOne
+    from pymongo.errors import DuplicateKeyError
+except ImportError:  # pragma: no cover - only needed outside TEST_MODE
+    MongoClient = UpdateOne = None  # type: ignore
+    DuplicateKeyError = None  # type: ignore
 
-if not TEST_MODE:
-    from pymongo import MongoClient
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:
+    import fastjsonschema
+except ImportError:  # pragma: no cover - fall back to the (slower) jsonschema package
+    fastjsonschema = None  # type: ignore
+    import jsonschema
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Keeps Flask's sorted keys and its fallback encoder (dates as HTTP dates, dataclasses,
+    Decimal, UUID), and writes response bodies as bytes without a str round trip.
+    """
+    _OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+    def _dump_bytes(self, obj, indent=False):
+        option = self._OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._dump_bytes(obj, indent=bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dump_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
 
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app)
 
 # File to store the registry
 DEFAULT_PORT = 6900
 
 
-# (Moved TEST_MODE definition above)
-
 # --- MongoDB integration (no file fallback) ---
-MONGO_URI = os.getenv("MONGODB_URI") or os.getenv("MONGO_URI")
-MONGO_DBNAME = os.getenv("MONGODB_DB", "iot_agents_db")
-
-if not TEST_MODE:
-    try:  # Mongo optional initialization
-        mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-        mongo_client.admin.command("ping")
-        mongo_db = mongo_client[MONGO_DBNAME]
-        agent_registry_col = mongo_db.get_collection("agent_registry")
-        client_registry_col = mongo_db.get_collection("client_registry")
-        users_col = mongo_db.get_collection("users")
-        mcp_registry_col = mongo_db.get_collection("mcp_registry")
-        messages_col = mongo_db.get_collection("messages")
-        USE_MONGO = True
-        print("Connected to MongoDB successfully – using MongoDB for persistence.")
-    except Exception as e:
-        USE_MONGO = False
-        agent_registry_col = None
-        client_registry_col = None
-        users_col = None
-        mcp_registry_col = None
-        messages_col = None
-        print(f"[registry] WARN: MongoDB unavailable ({e}); continuing in in-memory mode.")
-else:
-    USE_MONGO = False
-    agent_registry_col = None
-    client_registry_col = None
-    users_col = None
-    mcp_registry_col = None
-    messages_col = None
-    print("[registry] TEST_MODE enabled – using in-memory registries (no MongoDB).")
-
-# ---------------- Initial Data Load ------------------------
-# Reconstruct `registry` dict from MongoDB
+# Set by configure(); see create_app()
+TEST_MODE = False
+MONGO_URI = None
+MONGO_DBNAME = "iot_agents_db"
+USE_MONGO = False
+mongo_client = None
+mongo_db = None
+agent_registry_col = None
+client_registry_col = None
+users_col = None
+mcp_registry_col = None
+messages_col = None
+# Rendered /health body; it only depends on the persistence mode, so configure() builds it once
+_health_body = b""
+
+# In-memory registries; configure() refills them in place so references stay valid.
+# registry maps agent_id -> agent_url, plus registry["agent_status"][agent_id] -> status dict
+# (api_url, alive, assigned_to, last_update, capabilities, tags). Status entries stay plain
+# dicts: they are mutated per field by the endpoints and splatted straight into Mongo $set.
 registry = {"agent_status": {}}
-if not TEST_MODE and USE_MONGO and agent_registry_col is not None:
+client_registry = {"agent_map": {}}
+
+def configure(test_mode=None, mongo_uri=None, db_name=None):
+    """(Re)initialize persistence and reload the in-memory registries.
+
+    Arguments default to the TEST_MODE / MONGODB_URI (or MONGO_URI) / MONGODB_DB
+    environment variables. Safe to call again, e.g. to switch tests between in-memory
+    and MongoDB mode without re-importing this module.
+    """
+    global TEST_MODE, MONGO_URI, MONGO_DBNAME, USE_MONGO, mongo_client, mongo_db
+    global agent_registry_col, client_registry_col, users_col, mcp_registry_col, messages_col
+    global _health_body
+    TEST_MODE = (os.getenv("TEST_MODE") == "1") if test_mode is None else bool(test_mode)
+    MONGO_URI = mongo_uri or os.getenv("MONGODB_URI") or os.getenv("MONGO_URI")
+    MONGO_DBNAME = db_name or os.getenv("MONGODB_DB", "iot_agents_db")
+
+    if mongo_client is not None:
+        mongo_client.close()
+    USE_MONGO = False
+    mongo_client = mongo_db = None
+    agent_registry_col = client_registry_col = users_col = mcp_registry_col = messages_col = None
+
+    if TEST_MODE:
+        print("[registry] TEST_MODE enabled – using in-memory registries (no MongoDB).")
+    elif MongoClient is None:
+        print("[registry] WARN: pymongo not installed; continuing in in-memory mode.")
+    else:
+        try:  # Mongo optional initialization
+            mongo_client = _new_mongo_client()
+            mongo_client.admin.command("ping")
+            _bind_collections(mongo_client)
+            USE_MONGO = True
+            print("Connected to MongoDB successfully – using MongoDB for persistence.")
+            # Every persist/lookup filters on these keys; unique indexes avoid collection scans.
+            # Each is created on its own so one conflicting legacy collection doesn't block the rest.
+            for col, keys in (
+                (agent_registry_col, [("agent_id", 1)]),
+                (client_registry_col, [("client_name", 1)]),
+                (users_col, [("email", 1)]),
+                (mcp_registry_col, [("registry_provider", 1), ("qualified_name", 1)]),
+            ):
+                try:
+                    col.create_index(keys, unique=True)
+                except Exception as e:
+                    print(f"[registry] WARN: Could not create MongoDB index {keys} on {col.name} ({e}); continuing without it.")
+        except Exception as e:
+            if mongo_client is not None:
+                mongo_client.close()
+            USE_MONGO = False
+            mongo_client = mongo_db = None
+            agent_registry_col = client_registry_col = users_col = mcp_registry_col = messages_col = None
+            print(f"[registry] WARN: MongoDB unavailable ({e}); continuing in in-memory mode.")
+
+    _health_body = app.json.response({"status": "ok", "mongo": USE_MONGO and not TEST_MODE}).get_data()
+    reset_state()
+    if USE_MONGO:
+        _load_from_mongo()
+
+def _new_mongo_client():
+    # Size the pool for the request threads (see README: MONGO_POOL_MAX / MONGO_POOL_MIN)
+    return MongoClient(
+        MONGO_URI,
+        serverSelectionTimeoutMS=5000,
+        maxPoolSize=int(os.getenv("MONGO_POOL_MAX", "100")),
+        minPoolSize=int(os.getenv("MONGO_POOL_MIN", "10")),
+        waitQueueTimeoutMS=2000,
+    )
+
+def _bind_collections(client) -> None:
+    global mongo_client, mongo_db
+    global agent_registry_col, client_registry_col, users_col, mcp_registry_col, messages_col
+    mongo_client = client
+    mongo_db = client[MONGO_DBNAME]
+    agent_registry_col = mongo_db.get_collection("agent_registry")
+    client_registry_col = mongo_db.get_collection("client_registry")
+    users_col = mongo_db.get_collection("users")
+    mcp_registry_col = mongo_db.get_collection("mcp_registry")
+    messages_col = mongo_db.get_collection("messages")
+
+def _reconnect_mongo_after_fork() -> None:
+    """Give a forked child (e.g. a gunicorn --preload worker) its own MongoClient.
+
+    MongoClient is not fork-safe: the parent's sockets and monitor threads must not be
+    used from the child, so it is dropped (not closed) and a fresh client is bound.
+    The in-memory registries were copied by fork and are not reloaded.
+    """
+    if USE_MONGO:
+        _bind_collections(_new_mongo_client())
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reconnect_mongo_after_fork)
+
+def _load_from_mongo():
+    # ---------------- Initial Data Load ------------------------
+    # Reconstruct `registry` dict from MongoDB
     try:
         for doc in agent_registry_col.find():
             agent_id = doc.get("agent_id")
@@ -72,15 +194,15 @@ if not TEST_MODE and USE_MONGO and agent_registry_col is not None:
                 "last_update": doc.get("last_update"),
                 "api_url": doc.get("api_url")
             }
+            _sync_alive(agent_id)
         print(f"[registry] Loaded {len(registry) - 1} agents from MongoDB")
     except Exception as e:
         print(f"[registry] Error loading agent registry from MongoDB: {e}")
-        registry = {"agent_status": {}}
+        registry.clear()
+        registry["agent_status"] = {}
+        _alive_agents.clear()
 
-
-# Reconstruct `client_registry` dict from MongoDB
-client_registry = {"agent_map": {}}
-if not TEST_MODE and USE_MONGO and client_registry_col is not None:
+    # Reconstruct `client_registry` dict from MongoDB
     try:
         for doc in client_registry_col.find():
             client_name = doc.get("client_name")
@@ -91,67 +213,260 @@ if not TEST_MODE and USE_MONGO and client_registry_col is not None:
         print(f"[registry] Loaded {len(client_registry) - 1} clients from MongoDB")
     except Exception as e:
         print(f"[registry] Error loading client registry from MongoDB: {e}")
-        client_registry = {"agent_map": {}}
+        client_registry.clear()
+        client_registry["agent_map"] = {}
+    _rebuild_allocation_sets()
+    _invalidate_listings()
+
+def create_app(test_mode=None, mongo_uri=None, db_name=None):
+    """Configure the registry (see configure()) and return the Flask app."""
+    configure(test_mode=test_mode, mongo_uri=mongo_uri, db_name=db_name)
+    return app
+
+# Agents whose status is alive, kept in step with agent_status so /stats never scans the registry
+_alive_agents: Set[str] = set()
+
+def _sync_alive(agent_id: str) -> None:
+    """Refresh agent_id's membership in _alive_agents after its status changed."""
+    if registry.get('agent_status', {}).get(agent_id, {}).get('alive'):
+        _alive_agents.add(agent_id)
+    else:
+        _alive_agents.discard(agent_id)
+
+# Unassigned 'agentm' agents that /api/allocate and /api/signup hand out; guarded by _allocation_lock
+_free_agents: Set[str] = set()
+# Agents some client is mapped to: the values of client_registry['agent_map']
+_assigned_agents: Set[str] = set()
+_allocation_lock = threading.Lock()
+
+def _agent_kind(agent_id: str) -> str:
+    """Lower-cased kind letter after the 'agent' prefix ('m' allocatable, 's' selectable), or ''."""
+    return agent_id[5].lower() if len(agent_id) > 5 and agent_id.startswith('agent') else ''
+
+def _is_free(agent_id: str) -> bool:
+    return _agent_kind(agent_id) == 'm' and agent_id not in _assigned_agents
+
+def _rebuild_allocation_sets() -> None:
+    """Recompute _assigned_agents and _free_agents from the registries (after a bulk load)."""
+    with _allocation_lock:
+        _assigned_agents.clear()
+        _assigned_agents.update(client_registry.get('agent_map', {}).values())
+        _free_agents.clear()
+        _free_agents.update(aid for aid in registry if aid != 'agent_status' and _is_free(aid))
+
+def _assign_agent(client_name: str, agent_id: str) -> None:
+    """Map client_name to agent_id, keeping the allocation sets in step."""
+    agent_map = client_registry.setdefault('agent_map', {})
+    previous = agent_map.get(client_name)
+    agent_map[client_name] = agent_id
+    with _allocation_lock:
+        _assigned_agents.add(agent_id)
+        _free_agents.discard(agent_id)
+        # A remapped client may release its old agent (rare, so the value scan is fine)
+        if previous and previous != agent_id and previous not in agent_map.values():
+            _assigned_agents.discard(previous)
+            if previous in registry and _is_free(previous):
+                _free_agents.add(previous)
+    _invalidate_listings()
+
+def _take_free_agent() -> Optional[str]:
+    """Remove and return a random free agent id, or None when none is left."""
+    with _allocation_lock:
+        if not _free_agents:
+            return None
+        agent_id = random.choice(tuple(_free_agents))
+        _free_agents.discard(agent_id)
+        return agent_id
+
+def _take_registered_agent() -> Optional[Tuple[str, str, Optional[str]]]:
+    """Take a free agent that is still registered; return (agent_id, agent_url, api_url) or None.
+
+    An agent deleted between the take and the lookup is skipped (its DELETE already
+    dropped it for good) and another one is taken.
+    """
+    while True:
+        agent_id = _take_free_agent()
+        if agent_id is None:
+            return None
+        agent_url = registry.get(agent_id)
+        status = registry.get('agent_status', {}).get(agent_id)
+        if agent_url is not None and status is not None:
+            return agent_id, agent_url, status.get('api_url')
+
+def _release_agent(agent_id: str) -> None:
+    """Return a taken agent to the free set after its allocation failed."""
+    with _allocation_lock:
+        if agent_id in registry and _is_free(agent_id):
+            _free_agents.add(agent_id)
+
+# Serialized /list and /clients bodies, rebuilt by the next GET after a change. The generation
+# counter stops a GET that raced a change from caching a body built from the old state.
+_listing_bodies: Dict[str, bytes] = {}
+_listing_generation = 0
+_listing_lock = threading.Lock()
+
+def _invalidate_listings() -> None:
+    """Call after adding/removing agents or clients (or changing an agent URL)."""
+    global _listing_generation
+    with _listing_lock:
+        _listing_generation += 1
+        _listing_bodies.clear()
+
+def _listing_response(name: str, build: Callable[[], Dict[str, Any]]):
+    body = _listing_bodies.get(name)
+    if body is None:
+        generation = _listing_generation
+        body = app.json.response(build()).get_data()
+        with _listing_lock:
+            if generation == _listing_generation:
+                _listing_bodies[name] = body
+    return app.response_class(body, mimetype="application/json")
+
+def reset_state():
+    """Clear the in-memory agent/client registries in place (tests reuse one app instead of re-importing)."""
+    registry.clear()
+    registry["agent_status"] = {}
+    client_registry.clear()
+    client_registry["agent_map"] = {}
+    _cap_index.clear()
+    _tag_index.clear()
+    _alive_agents.clear()
+    _free_agents.clear()
+    _assigned_agents.clear()
+    _mcp_cache.clear()
+    _invalidate_listings()
 
 # ---------------------------------------------------------------------------
 
 # ---------------- Define helper functions BEFORE routes -------------------
 
-def save_client_registry():
-    """Persist the client registry to MongoDB only (no-op in TEST_MODE)."""
+def save_client_registry(client_names: Optional[Iterable[str]] = None):
+    """Persist the client registry (or just client_names) to MongoDB only (no-op in TEST_MODE).
+
+    All upserts go out as one unordered bulk_write instead of a round trip per client.
+    """
     if TEST_MODE or not USE_MONGO or client_registry_col is None:
         return
+    if client_names is None:
+        client_names = client_registry.keys()
+    agent_map = client_registry.get('agent_map', {})
+    ops = [
+        UpdateOne(
+            {"client_name": client_name},
+            {"$set": {"api_url": client_registry[client_name], "agent_id": agent_map.get(client_name)}},  # Store api_url correctly
+            upsert=True,
+        )
+        for client_name in client_names
+        if client_name != 'agent_map' and client_name in client_registry
+    ]
+    if not ops:
+        return
     try:
-        for client_name, api_url in client_registry.items():
-            if client_name == 'agent_map':
-                continue
-            agent_id = client_registry.get('agent_map', {}).get(client_name)
-            client_registry_col.update_one(
-                {"client_name": client_name},
-                {"$set": {"api_url": api_url, "agent_id": agent_id}},  # Store api_url correctly
-                upsert=True,
-            )
+        client_registry_col.bulk_write(ops, ordered=False)
     except Exception as e:
         print(f"[registry] Error saving client registry to MongoDB: {e}")
 
-def save_registry():
-    """Persist the agent registry to MongoDB only (no-op in TEST_MODE)."""
+def save_registry(agent_ids: Optional[Iterable[str]] = None):
+    """Persist the agent registry (or just agent_ids) to MongoDB only (no-op in TEST_MODE).
+
+    All upserts go out as one unordered bulk_write instead of a round trip per agent.
+    """
     if TEST_MODE or not USE_MONGO or agent_registry_col is None:
         return
+    if agent_ids is None:
+        agent_ids = registry.keys()
+    agent_status = registry.get('agent_status', {})
+    ops = [
+        UpdateOne(
+            {"agent_id": agent_id},
+            {"$set": {"agent_id": agent_id, "agent_url": registry[agent_id], **agent_status.get(agent_id, {})}},
+            upsert=True,
+        )
+        for agent_id in agent_ids
+        if agent_id != 'agent_status' and agent_id in registry
+    ]
+    if not ops:
+        return
     try:
-        for agent_id, agent_url in registry.items():
-            if agent_id == 'agent_status':
-                continue
-            status = registry.get('agent_status', {}).get(agent_id, {})
-            mongo_doc = {
-                "agent_id": agent_id,
-                "agent_url": agent_url,
-                **status
-            }
-            agent_registry_col.update_one(
-                {"agent_id": agent_id},
-                {"$set": mongo_doc},
-                upsert=True,
-            )
+        agent_registry_col.bulk_write(ops, ordered=False)
     except Exception as e:
         print(f"[registry] Error saving agent registry to MongoDB: {e}")
 
+def delete_persisted(agent_ids: Iterable[str] = (), client_names: Iterable[str] = ()):
+    """Remove the given agent/client documents from MongoDB only (no-op in TEST_MODE)."""
+    if TEST_MODE or not USE_MONGO:
+        return
+    agent_ids, client_names = list(agent_ids), list(client_names)
+    try:
+        if agent_ids and agent_registry_col is not None:
+            agent_registry_col.delete_many({"agent_id": {"$in": agent_ids}})
+        if client_names and client_registry_col is not None:
+            client_registry_col.delete_many({"client_name": {"$in": client_names}})
+    except Exception as e:
+        print(f"[registry] Error deleting registry documents from MongoDB: {e}")
+
+def _compile_body_schema(schema: Dict[str, Any]) -> Callable[[Any], Any]:
+    """Compile a request-body JSON schema; the validator raises ValueError on mismatch."""
+    if fastjsonschema is not None:
+        return fastjsonschema.compile(schema)  # JsonSchemaValueException is a ValueError
+
+    def validate(data):
+        try:
+            jsonschema.validate(data, schema)
+        except jsonschema.ValidationError as e:
+            raise ValueError(e.message) from None
+        return data
+    return validate
+
+def _object_with_strings(*names: str, **nested: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema for an object whose `names` are required non-empty strings (plus required `nested` schemas)."""
+    properties: Dict[str, Any] = {name: {"type": "string", "minLength": 1} for name in names}
+    properties.update(nested)
+    return {"type": "object", "required": [*names, *nested], "properties": properties}
+
+# Compiled once at import: each handler validates its body in one call instead of .get() chains
+_validate_allocate = _compile_body_schema({
+    "type": "object",
+    "required": ["client_id", "userProfile"],  # client_id only has to be present
+    "properties": {"userProfile": _object_with_strings("name")},
+})
+_validate_check_user = _compile_body_schema(_object_with_strings("email"))
+_validate_signup = _compile_body_schema(_object_with_strings("email", "username"))
+_validate_setup = _compile_body_schema(_object_with_strings("email", "username", "agent_id"))
+
+def _parse_body(validate: Callable[[Any], Any]) -> Optional[Dict[str, Any]]:
+    """Return the request's JSON body if it passes validate, else None (caller answers 400)."""
+    data = request.get_json(silent=True)
+    try:
+        validate(data)
+    except ValueError:
+        return None
+    return data
+
 # ---------------- New Extended Endpoints -----------------
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Simple health check endpoint."""
-    return jsonify({"status": "ok", "mongo": USE_MONGO and not TEST_MODE})
+    """Simple health check endpoint (serves the body cached by configure())."""
+    return app.response_class(_health_body, mimetype="application/json")
+
+# Subsystems that finish warming up after the server starts listening (the switchboard)
+_readiness_checks: List[Callable[[], bool]] = []
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 503 until every warming-up subsystem is ready (/health is liveness only)."""
+    if all(check() for check in _readiness_checks):
+        return jsonify({"status": "ready"})
+    return jsonify({"status": "starting"}), 503
 
 @app.route('/stats', methods=['GET'])
 def stats():
     """Return basic statistics about the registry."""
-    agents = [a for a in registry.keys() if a != 'agent_status']
-    total_agents = len(agents)
-    alive_agents = 0
-    if 'agent_status' in registry:
-        alive_agents = sum(1 for a in agents if registry['agent_status'].get(a, {}).get('alive'))
-    total_clients = len([c for c in client_registry.keys() if c != 'agent_map'])
+    # Reserved bookkeeping keys ('agent_status' / 'agent_map') are not agents or clients
+    total_agents = len(registry) - ('agent_status' in registry)
+    alive_agents = len(_alive_agents)
+    total_clients = len(client_registry) - ('agent_map' in client_registry)
     return jsonify({
         'total_agents': total_agents,
         'alive_agents': alive_agents,
@@ -175,6 +490,32 @@ def _build_agent_payload(agent_id: str) -> Dict[str, Any]:
     }
     return payload
 
+# Inverted indexes for /search filters (capability/tag -> agent_ids), kept in sync with agent_status
+_cap_index: Dict[str, Set[str]] = {}
+_tag_index: Dict[str, Set[str]] = {}
+
+def _index_agent(agent_id: str) -> None:
+    status_obj = registry.get('agent_status', {}).get(agent_id, {})
+    for index, values in ((_cap_index, status_obj.get('capabilities')), (_tag_index, status_obj.get('tags'))):
+        for value in values or ():
+            if isinstance(value, str):
+                index.setdefault(value, set()).add(agent_id)
+
+def _unindex_agent(agent_id: str) -> None:
+    status_obj = registry.get('agent_status', {}).get(agent_id, {})
+    for index, values in ((_cap_index, status_obj.get('capabilities')), (_tag_index, status_obj.get('tags'))):
+        for value in values or ():
+            if not isinstance(value, str):
+                continue
+            agent_ids = index.get(value)
+            if agent_ids is not None:
+                agent_ids.discard(agent_id)
+                if not agent_ids:
+                    del index[value]
+
+def _lookup_any(index: Dict[str, Set[str]], values: Iterable[str]) -> Set[str]:
+    return set().union(*(index.get(v, ()) for v in values))
+
 @app.route('/search', methods=['GET'])
 def search_agents():
     """Search agents by substring match and optional capabilities/tags filters.
@@ -189,22 +530,21 @@ def search_agents():
     capabilities_list = [c.strip() for c in capabilities_filter.split(',')] if capabilities_filter else []
     tags_list = [t.strip() for t in tags_filter.split(',')] if tags_filter else []
 
+    if capabilities_list or tags_list:
+        # Filtered search: intersect the inverted indexes instead of scanning every agent
+        candidates = _lookup_any(_cap_index, capabilities_list) if capabilities_list else None
+        if tags_list:
+            tagged = _lookup_any(_tag_index, tags_list)
+            candidates = tagged if candidates is None else candidates & tagged
+        agent_ids = sorted(candidates)
+    else:
+        agent_ids = [a for a in registry.keys() if a != 'agent_status']
+
     results: List[Dict[str, Any]] = []
-    for agent_id in registry.keys():
-        if agent_id == 'agent_status':
-            continue
+    for agent_id in agent_ids:
         if query and query not in agent_id.lower():
             continue
-        payload = _build_agent_payload(agent_id)
-        if capabilities_list:
-            agent_caps = payload.get('capabilities', []) or []
-            if not any(c in agent_caps for c in capabilities_list):
-                continue
-        if tags_list:
-            agent_tags = payload.get('tags', []) or []
-            if not any(t in agent_tags for t in tags_list):
-                continue
-        results.append(payload)
+        results.append(_build_agent_payload(agent_id))
     return jsonify(results)
 
 @app.route('/agents/<agent_id>', methods=['GET'])
@@ -218,19 +558,26 @@ def delete_agent(agent_id):
     if agent_id not in registry or agent_id == 'agent_status':
         return jsonify({'error': 'Agent not found'}), 404
     # Remove from registries
+    _unindex_agent(agent_id)
+    _alive_agents.discard(agent_id)
+    with _allocation_lock:
+        _free_agents.discard(agent_id)
+        assigned = agent_id in _assigned_agents
+        _assigned_agents.discard(agent_id)
     registry.pop(agent_id, None)
     if 'agent_status' in registry:
         registry['agent_status'].pop(agent_id, None)
-    # Remove any client assignments
+    # Remove any client assignments (only assigned agents have any)
     to_remove = []
-    for client_name, mapped_agent in client_registry.get('agent_map', {}).items():
-        if mapped_agent == agent_id:
-            to_remove.append(client_name)
+    if assigned:
+        for client_name, mapped_agent in client_registry.get('agent_map', {}).items():
+            if mapped_agent == agent_id:
+                to_remove.append(client_name)
     for client_name in to_remove:
         client_registry.pop(client_name, None)
         client_registry.get('agent_map', {}).pop(client_name, None)
-    save_registry()
-    save_client_registry()
+    _invalidate_listings()
+    delete_persisted([agent_id], to_remove)
     return jsonify({'status': 'deleted', 'agent_id': agent_id})
 
 @app.route('/agents/<agent_id>/status', methods=['PUT'])
@@ -238,6 +585,7 @@ def update_agent_status(agent_id):
     if agent_id not in registry or agent_id == 'agent_status':
         return jsonify({'error': 'Agent not found'}), 404
     data = request.json or {}
+    _unindex_agent(agent_id)
     status_obj = registry.get('agent_status', {}).get(agent_id, {})
     # Update mutable fields
     if 'alive' in data:
@@ -251,7 +599,9 @@ def update_agent_status(agent_id):
     if 'tags' in data and isinstance(data['tags'], list):
         status_obj['tags'] = data['tags']
     registry['agent_status'][agent_id] = status_obj
-    save_registry()
+    _index_agent(agent_id)
+    _sync_alive(agent_id)
+    save_registry([agent_id])
     return jsonify({'status': 'updated', 'agent': _build_agent_payload(agent_id)})
 
 @app.route('/mcp_servers', methods=['GET'])
@@ -402,8 +752,8 @@ def map_capability():
 
 @app.route('/api/allocate', methods=['POST'])
 def allocate_agent():
-    data = request.json
-    if not data or 'client_id' not in data:
+    data = _parse_body(_validate_allocate)
+    if data is None:
         return jsonify({"error": "Missing client_name"}), 400
 
     str_name = data['userProfile']['name']
@@ -424,27 +774,11 @@ def allocate_agent():
             "api_url": api_url       # API URL
         })
 
-    # Find an available agent from the main registry
-    available_agents = []
-
-    # First, find all allocated agent IDs
-    assigned_agent_ids = set()
-    for key, value in client_registry.items():
-        if key == "agent_map":
-            continue
-        agent_id = client_registry['agent_map'][key]
-        assigned_agent_ids.add(agent_id)
-
-    # Loop through all agents in the registry to find available ones
-    for agent_id, agent_url in registry.items():
-        if agent_id != 'agent_status' and agent_id.startswith('agentm') and agent_id not in assigned_agent_ids:
-            available_agents.append((agent_id, agent_url))
-
-    if not available_agents:
+    # Take a random available agent from the free set
+    taken = _take_registered_agent()
+    if taken is None:
         return jsonify({"error": "No available agents at this time"}), 503
-    # Select a random available agent
-    selected_agent_id, selected_agent_url = random.choice(available_agents)
-    api_url = registry['agent_status'][selected_agent_id]['api_url']
+    selected_agent_id, selected_agent_url, api_url = taken
 
     print(f"Selected Agent URL (bridge): {selected_agent_url}")
     print(f"API URL for client: {api_url}")
@@ -453,12 +787,9 @@ def allocate_agent():
     client_registry[client_name] = api_url  # Store API URL, not agent URL
 
     # client-name to agent-id mapping
-    if 'agent_map' not in client_registry:
-        client_registry['agent_map'] = {}
-
-    client_registry['agent_map'][client_name] = selected_agent_id
+    _assign_agent(client_name, selected_agent_id)
 
-    save_client_registry()
+    save_client_registry([client_name])
 
     print("Selected Agent ID: ", selected_agent_id)
 
@@ -467,7 +798,8 @@ def allocate_agent():
         registry['agent_status'][selected_agent_id]['alive'] = True
         registry['agent_status'][selected_agent_id]['assigned_to'] = client_name
         registry['agent_status'][selected_agent_id]['last_update'] = datetime.now().isoformat()
-        save_registry()
+        _sync_alive(selected_agent_id)
+        save_registry([selected_agent_id])
 
     # Return the assigned agent info
     return jsonify({
@@ -477,16 +809,9 @@ def allocate_agent():
         "message": f"Agent {selected_agent_id} assigned to {client_name}"
     })
 
-@app.route('/register', methods=['POST'])
-def register():
-    data = request.json
-    if not data or 'agent_id' not in data or 'agent_url' not in data:
-        return jsonify({"error": "Missing agent_id or agent_url"}), 400
-
-    agent_id = data['agent_id']
-    agent_url = data['agent_url']
-    api_url = data['api_url'] # URL for the API PORT
-
+def _store_agent(agent_id, agent_url, api_url):
+    """Record an agent and reset its status (caller persists)."""
+    _unindex_agent(agent_id)  # re-registration drops capabilities/tags
     # Store the agent URL in the registry
     registry[agent_id] = agent_url
 
@@ -501,12 +826,41 @@ def register():
         'api_url': api_url,
         'last_update': datetime.now().isoformat()
     }
+    _alive_agents.discard(agent_id)
+    if _is_free(agent_id):
+        with _allocation_lock:
+            _free_agents.add(agent_id)
+    _invalidate_listings()
+
+@app.route('/register', methods=['POST'])
+def register():
+    data = request.json
+    if isinstance(data, dict) and isinstance(data.get('agents'), list):
+        return _register_batch(data['agents'])
+    if not data or 'agent_id' not in data or 'agent_url' not in data:
+        return jsonify({"error": "Missing agent_id or agent_url"}), 400
+
+    agent_id = data['agent_id']
+    agent_url = data['agent_url']
+    api_url = data.get('api_url') # URL for the API PORT
+
+    _store_agent(agent_id, agent_url, api_url)
 
     # Persist immediately if Mongo available
-    save_registry()
+    save_registry([agent_id])
 
     return jsonify({"status": "success", "message": f"Agent {agent_id} registered successfully"})
 
+def _register_batch(agents):
+    """Register {'agents': [...]} in one request, persisting once for the whole batch."""
+    for i, entry in enumerate(agents):
+        if not isinstance(entry, dict) or 'agent_id' not in entry or 'agent_url' not in entry:
+            return jsonify({"error": f"Missing agent_id or agent_url in agents[{i}]"}), 400
+    for entry in agents:
+        _store_agent(entry['agent_id'], entry['agent_url'], entry.get('api_url'))
+    save_registry([entry['agent_id'] for entry in agents])
+    return jsonify({"status": "success", "registered": [entry['agent_id'] for entry in agents]})
+
 @app.route('/lookup/<id>', methods=['GET'])
 def lookup(id):
     """
@@ -554,8 +908,7 @@ def resolve_sender(agent_id):
 @app.route('/list', methods=['GET'])
 def list_agents():
     # Return the registry (excluding agent_status for cleaner output)
-    result = {k: v for k, v in registry.items() if k != 'agent_status'}
-    return jsonify(result)
+    return _listing_response('list', lambda: {k: v for k, v in registry.items() if k != 'agent_status'})
 
 @app.route('/status/<agent_id>', methods=['GET'])
 def agent_status(agent_id):
@@ -567,15 +920,14 @@ def agent_status(agent_id):
 @app.route('/clients', methods=['GET'])
 def list_clients():
     """Return the client registry"""
-    result = {k: 'alive' for k, v in client_registry.items() if k != 'agent_map'}
-    return jsonify(result)
+    return _listing_response('clients', lambda: {k: 'alive' for k in client_registry if k != 'agent_map'})
 
 @app.route('/api/check-user', methods=['POST'])
 def check_user():
-    data = request.json
-    email = data.get('email')
-    if not email:
+    data = _parse_body(_validate_check_user)
+    if data is None:
         return jsonify({'error': 'Missing email'}), 400
+    email = data['email']
 
     if USE_MONGO and not TEST_MODE and users_col is not None:
         user = users_col.find_one({'email': email})
@@ -586,12 +938,11 @@ def check_user():
 
 @app.route('/api/signup', methods=['POST'])
 def signup():
-    data = request.json
-    email = data.get('email')
-    username = data.get('username')
-
-    if not email or not username:
+    data = _parse_body(_validate_signup)
+    if data is None:
         return jsonify({'status': 'error', 'message': 'Missing email or username'}), 400
+    email = data['email']
+    username = data['username']
 
     if not USE_MONGO or TEST_MODE:
         return jsonify({'status': 'error', 'message': 'MongoDB not available'}), 500
@@ -604,16 +955,11 @@ def signup():
     if user:
         return jsonify({'status': 'error', 'message': 'User already exists'}), 400
 
-    # Find an available agent
-    assigned_agent_ids = set()
-    for client, agent_id in client_registry.get('agent_map', {}).items():
-        assigned_agent_ids.add(agent_id)
-    available_agents = [aid for aid in registry if aid != 'agent_status' and aid.startswith('agentm') and aid not in assigned_agent_ids]
-    if not available_agents:
+    # Take a random available agent from the free set
+    taken = _take_registered_agent()
+    if taken is None:
         return jsonify({'status': 'error', 'message': 'No available agents'}), 503
-    selected_agent_id = random.choice(available_agents)
-    agent_url = registry[selected_agent_id]
-    api_url = registry['agent_status'][selected_agent_id].get('api_url')
+    selected_agent_id, agent_url, api_url = taken
 
     # Create user in MongoDB
     user_doc = {
@@ -624,49 +970,52 @@ def signup():
         'api_url': api_url
     }
     if USE_MONGO and not TEST_MODE and users_col is not None:
-        users_col.insert_one(user_doc)
+        # The agent is out of the free set but not assigned yet: hand it back on failure
+        try:
+            users_col.insert_one(user_doc)
+        except DuplicateKeyError:  # a concurrent signup for the same email won
+            _release_agent(selected_agent_id)
+            return jsonify({'status': 'error', 'message': 'User already exists'}), 400
+        except Exception as e:
+            _release_agent(selected_agent_id)
+            return jsonify({'status': 'error', 'message': f'Could not create user: {e}'}), 500
 
     # Remove _id if present (it will be added by MongoDB but not in user_doc here)
     user_doc.pop('_id', None)
 
     # Assign agent to user in client_registry - store API URL
     client_registry[username] = api_url  # Store API URL, not agent URL
-    if 'agent_map' not in client_registry:
-        client_registry['agent_map'] = {}
-    client_registry['agent_map'][username] = selected_agent_id
-    save_client_registry()
+    _assign_agent(username, selected_agent_id)
+    save_client_registry([username])
 
     # Update agent status
     if 'agent_status' in registry and selected_agent_id in registry['agent_status']:
         registry['agent_status'][selected_agent_id]['alive'] = True
         registry['agent_status'][selected_agent_id]['assigned_to'] = username
         registry['agent_status'][selected_agent_id]['last_update'] = datetime.now().isoformat()
-        save_registry()
+        _sync_alive(selected_agent_id)
+        save_registry([selected_agent_id])
 
     return jsonify({'status': 'success', 'user': user_doc, 'agent_url': agent_url, 'api_url': api_url})
 
 @app.route('/api/setup', methods=['POST'])
 def setup():
-    data = request.json
-    email = data.get('email')
-    user_selected_agent_id = data.get('agent_id')
-    username = data.get('username')
-
-    if not email or not username or not user_selected_agent_id:
+    data = _parse_body(_validate_setup)
+    if data is None:
         return jsonify({'status': 'error', 'message': 'Missing email or username or agent_id'}), 400
-
-    if not user_selected_agent_id.split("agent")[1][0].lower() == "s":
-            # Persist status update
-            save_registry()
+    email = data['email']
+    user_selected_agent_id = data['agent_id']
+    username = data['username']
 
     if user_selected_agent_id not in registry:
         return jsonify({'status': 'error', 'message': 'Agent not found'}), 400
 
-    assigned_agent_ids = set()
-    for client, agent_id in client_registry.get('agent_map', {}).items():
-        assigned_agent_ids.add(agent_id)
+    # Only 'agents…' ids (either case of the kind letter) are user-selectable;
+    # 'agentm…' ids are handed out by allocate/signup
+    if _agent_kind(user_selected_agent_id) != 's':
+        return jsonify({'status': 'error', 'message': 'Agent cannot be selected for setup'}), 400
 
-    if user_selected_agent_id in assigned_agent_ids:
+    if user_selected_agent_id in _assigned_agents:
         return jsonify({'status': 'error', 'message': 'Agent already assigned to a user'}), 400
 
 
@@ -702,20 +1051,54 @@ def setup():
 
     # Assign agent to user in client_registry - store API URL
     client_registry[username] = api_url  # Store API URL, not agent URL
-    if 'agent_map' not in client_registry:
-        client_registry['agent_map'] = {}
-    client_registry['agent_map'][username] = user_selected_agent_id
-    save_client_registry()
+    _assign_agent(username, user_selected_agent_id)
+    save_client_registry([username])
 
     # Update agent status
     if 'agent_status' in registry and user_selected_agent_id in registry['agent_status']:
         registry['agent_status'][user_selected_agent_id]['alive'] = True
         registry['agent_status'][user_selected_agent_id]['assigned_to'] = username
         registry['agent_status'][user_selected_agent_id]['last_update'] = datetime.now().isoformat()
-        save_registry()
+        _sync_alive(user_selected_agent_id)
+        save_registry([user_selected_agent_id])
 
     return jsonify({'status': 'success', 'user': user_doc, 'agent_url': agent_url, 'api_url': api_url})
 
+# /get_mcp_registry hits by (registry_provider, qualified_name) -> (expires_at, doc). MCP
+# entries are written out-of-band, so POST /admin/mcp_cache/invalidate drops them early.
+MCP_CACHE_TTL = float(os.getenv("MCP_CACHE_TTL", "300"))  # 0 disables caching
+MCP_CACHE_MAXSIZE = 1024
+_mcp_cache: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_mcp_cache_lock = threading.Lock()
+
+def _get_cached_mcp(key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+    with _mcp_cache_lock:
+        entry = _mcp_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _mcp_cache[key]
+            return None
+        _mcp_cache.move_to_end(key)
+        return entry[1]
+
+def _cache_mcp(key: Tuple[str, str], doc: Dict[str, Any]) -> None:
+    if MCP_CACHE_TTL <= 0:
+        return
+    with _mcp_cache_lock:
+        _mcp_cache[key] = (time.monotonic() + MCP_CACHE_TTL, doc)
+        _mcp_cache.move_to_end(key)
+        while len(_mcp_cache) > MCP_CACHE_MAXSIZE:
+            _mcp_cache.popitem(last=False)
+
+@app.route('/admin/mcp_cache/invalidate', methods=['POST'])
+def invalidate_mcp_cache():
+    """Drop every cached /get_mcp_registry lookup."""
+    with _mcp_cache_lock:
+        removed = len(_mcp_cache)
+        _mcp_cache.clear()
+    return jsonify({"status": "success", "invalidated": removed})
+
 @app.route('/get_mcp_registry', methods=['GET'])
 def get_mcp_server_details():
     """
@@ -729,37 +1112,41 @@ def get_mcp_server_details():
             "error": "Missing required query parameters: registry_provider and qualified_name"
         }), 400
 
+    key = (registry_provider, qualified_name)
+    mcp_doc = _get_cached_mcp(key)
+    if mcp_doc is not None:
+        return jsonify(mcp_doc)
+
     try:
         # Query the mcp_registry collection for the specified registry_provider and qualified_name
-        mcp_doc = None
         if USE_MONGO and not TEST_MODE and mcp_registry_col is not None:
             mcp_doc = mcp_registry_col.find_one({
                 "registry_provider": registry_provider,
                 "qualified_name": qualified_name
-            })
+            }, {"_id": 0})  # MongoDB's _id is not part of the response
 
         if not mcp_doc:
             return jsonify({
                 "error": f"MCP server not found for registry_provider: {registry_provider}, qualified_name: {qualified_name}"
             }), 404
 
-        # Remove MongoDB's _id field from the response
-        if '_id' in mcp_doc:
-            del mcp_doc['_id']
-
+        _cache_mcp(key, mcp_doc)
         return jsonify(mcp_doc)
 
     except Exception as e:
         return jsonify({"error": f"Error retrieving MCP server details: {str(e)}"}), 500
 
 
+configure()
+
 # ---------------- Switchboard (Optional) -----------------
 ENABLE_FEDERATION = os.getenv('ENABLE_FEDERATION', 'false').lower() == 'true'
 
 if ENABLE_FEDERATION:
     try:
-        from switchboard.switchboard_routes import register_switchboard_routes
+        from switchboard.switchboard_routes import is_ready, register_switchboard_routes
         register_switchboard_routes(app)
+        _readiness_checks.append(is_ready)
         print("[registry] ✅ Switchboard enabled")
         print("[registry]    Environment variables:")
         print(f"[registry]    - AGNTCY_ADS_URL: {os.getenv('AGNTCY_ADS_URL', 'not set')}")
@@ -777,7 +1164,17 @@ else:
 # -------------------------------------------------------------------
 
 
+def _server_ssl_context(cert_path: str, key_path: str) -> ssl.SSLContext:
+    """TLS context for the built-in server: no version cap, so clients negotiate TLS 1.3
+    (1-RTT handshakes, resumption via session tickets); TLS 1.2 is the floor."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
 if __name__ == '__main__':
+    # Handlers mostly wait on MongoDB or federated registries, so serve each request on
+    # its own thread; shared allocation state is guarded by _allocation_lock
     port = int(os.environ.get('PORT', DEFAULT_PORT))
     cert_dir = os.environ.get('CERT_DIR')
 
@@ -787,14 +1184,15 @@ if __name__ == '__main__':
 
         if os.path.exists(cert_path) and os.path.exists(key_path):
             app.run(
-                ssl_context=(cert_path, key_path),
+                ssl_context=_server_ssl_context(cert_path, key_path),
                 host='0.0.0.0',
-                port=port
+                port=port,
+                threaded=True
             )
         else:
             print("Certificate files not found. Running without SSL...")
-            app.run(host='0.0.0.0', port=port)
+            app.run(host='0.0.0.0', port=port, threaded=True)
     else:
         print("No certificate directory specified. Running without SSL...")
-        app.run(host='0.0.0.0', port=port)
+        app.run(host='0.0.0.0', port=port, threaded=True)
 
@@ -8,8 +8,15 @@ import signal
 import argparse
 import socket
 import shutil
+import stat
+import tempfile
 from urllib.parse import urlparse
 
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, launches are not serialized
+    fcntl = None
+
 def get_local_ip():
     """Get the local IP address of the system"""
     try:
@@ -205,8 +212,42 @@ def setup_certificates(domain):
         print(traceback.format_exc())
         return None
 
+def _lock_dir():
+    """Per-user directory for the launcher lock: $XDG_RUNTIME_DIR, else a private dir under the temp dir.
+
+    Other users can't pre-create (and hold) the lock file there.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return runtime_dir
+    path = os.path.join(tempfile.gettempdir(), f"nanda-registry-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{path} is not a private directory owned by this user")
+    return path
+
+def acquire_launcher_lock(port):
+    """Take an exclusive, non-blocking flock for this port; return the fd (keep it open) or None.
+
+    The OS drops the lock when this process exits, so overlapping launches
+    (restarts, two deploys) can't both start a registry on the same port.
+    Raises OSError if no private lock directory is available.
+    """
+    lock_path = os.path.join(_lock_dir(), f"nanda-registry-{port}.lock")
+    fd = os.open(lock_path, os.O_CREAT | os.O_RDWR | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    return fd
+
 # Global process variables for cleanup
 registry_process = None
+launcher_lock_fd = None
 SERVER_IP = get_local_ip()
 
 def cleanup(signum=None, frame=None):
@@ -242,7 +283,7 @@ def get_ngrok_url():
     return None
 
 def main():
-    global registry_process
+    global registry_process, launcher_lock_fd
     
     # Set up signal handlers for graceful exit
     signal.signal(signal.SIGINT, cleanup)
@@ -256,6 +297,18 @@ def main():
     
     registry_port = args.port
     
+    if fcntl is None:
+        print("File locking not available on this platform; not guarding against overlapping launches.")
+    else:
+        try:
+            launcher_lock_fd = acquire_launcher_lock(registry_port)
+        except OSError as e:
+            print(f"Could not take the launcher lock ({e}); continuing without it.")
+        else:
+            if launcher_lock_fd is None:
+                print(f"Another run_registry.py already manages port {registry_port}; exiting.")
+                sys.exit(1)
+    
     # Determine the public URL
     registry_url = None
     
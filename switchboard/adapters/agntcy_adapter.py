@@ -1,33 +1,205 @@
 """AGNTCY Registry Adapter - queries AGNTCY ADS via gRPC SDK."""
 
 import asyncio
+import concurrent.futures
+import itertools
 import json
+import logging
 import os
+import re
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from .base_adapter import BaseRegistryAdapter
 
 # AGNTCY SDK imports
 try:
     from agntcy.dir_sdk.client import Config, Client
     from agntcy.dir_sdk.models import search_v1, core_v1
+    from google.protobuf import struct_pb2
     from google.protobuf.json_format import MessageToDict
     AGNTCY_SDK_AVAILABLE = True
 except ImportError:
     AGNTCY_SDK_AVAILABLE = False
     print("[WARN] AGNTCY SDK not available. Install with: pip install agntcy-dir-sdk")
 
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+_AGNTCY_INTEROP_PATH = _REPO_ROOT / "agntcy-interop"
+# Taxonomy cloned inside the project for self-contained setup
+_DEFAULT_SCHEMA_PATH = _REPO_ROOT / ".oasf-taxonomy" / "schema"
+
 # Import SkillMapper from agntcy-interop
 try:
     import sys
-    sys.path.insert(0, str(Path(__file__).parent.parent.parent / "agntcy-interop"))
-    from batch.export_nanda_to_agntcy import SkillMapper
+    if str(_AGNTCY_INTEROP_PATH) not in sys.path:
+        sys.path.insert(0, str(_AGNTCY_INTEROP_PATH))
+    from batch.export_nanda_to_agntcy import SkillMapper, get_skill_mapper
     SKILL_MAPPER_AVAILABLE = True
 except ImportError:
     SKILL_MAPPER_AVAILABLE = False
     print("[WARN] SkillMapper not available. Skill taxonomy mapping disabled.")
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+# Bounded pool for the blocking SDK calls, so a burst of lookups can't grow
+# asyncio's default executor unchecked
+_AGNTCY_EXEC = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="agntcy")
+# Concurrent lookups' pulls are coalesced into one pull(refs) of up to this many refs,
+# collected for at most PULL_BATCH_DELAY seconds; AGNTCY_PULL_BATCH<=1 disables batching
+PULL_BATCH_SIZE = int(os.environ.get("AGNTCY_PULL_BATCH", "32"))
+PULL_BATCH_DELAY = 0.005
+
+# Locator type keywords (case-insensitive substrings); source/github outranks api/service
+_AGENT_LOCATOR_RE = re.compile(r"source|github", re.IGNORECASE)
+_API_LOCATOR_RE = re.compile(r"api|service", re.IGNORECASE)
+# Set AGNTCY_MESSAGE_TO_DICT=1 to convert pulled records with protobuf's generic MessageToDict
+USE_MESSAGE_TO_DICT = os.environ.get("AGNTCY_MESSAGE_TO_DICT") == "1"
+
+
+@lru_cache(maxsize=256)
+def _locator_kind(loc_type: str) -> Optional[str]:
+    """Classify a locator type as "agent", "api" or None; types come from a small vocabulary, so memoize."""
+    if _AGENT_LOCATOR_RE.search(loc_type):
+        return "agent"
+    if _API_LOCATOR_RE.search(loc_type):
+        return "api"
+    return None
+
+
+class _PullBatcher:
+    """
+    Micro-batches pull requests from concurrent lookups on one event loop.
+    
+    Callers await pull(ref); a collector task gathers refs for up to max_delay
+    (or max_batch refs) and issues a single blocking pull(refs) on the AGNTCY
+    executor. If a batched pull fails, each ref is retried on its own so one
+    bad record can't fail the others.
+    """
+    
+    def __init__(self, pull, max_batch: int, max_delay: float):
+        self._pull = pull
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: set = set()
+    
+    async def pull(self, ref):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new loop: the queue and collector belong to one loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._spawn(self._collect())
+        future = loop.create_future()
+        self._queue.put_nowait((ref, future))
+        return await future
+    
+    def _spawn(self, coro) -> None:
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._spawn(self._dispatch(batch))
+    
+    async def _dispatch(self, batch) -> None:
+        loop = asyncio.get_running_loop()
+        refs = [ref for ref, _ in batch]
+        try:
+            records = await loop.run_in_executor(_AGNTCY_EXEC, self._pull, refs)
+            if len(records) != len(refs):
+                raise ValueError(f"pull returned {len(records)} records for {len(refs)} refs")
+        except Exception as e:
+            if len(batch) == 1:
+                _resolve(batch[0][1], exception=e)
+                return
+            logger.warning("Batched pull of %d refs failed (%s); pulling individually", len(refs), e)
+            for item in batch:
+                self._spawn(self._dispatch([item]))
+            return
+        for (_, future), record in zip(batch, records):
+            _resolve(future, record)
+
+
+def _resolve(future: asyncio.Future, result=None, exception: Optional[BaseException] = None) -> None:
+    if future.done():  # caller was cancelled
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+def _classify_locators(locators: List[Any]) -> Tuple[str, str]:
+    """
+    Pick (agent_url, api_url) from OASF locators in a single pass.
+    
+    The last source/github locator is the agent URL and the last api/service
+    locator is the API URL; without a source locator the first locator's URL
+    is used as the agent URL.
+    """
+    if not locators:
+        return "", ""
+    agent_url = ""
+    api_url = ""
+    first_url = None
+    
+    for locator in locators:
+        try:
+            loc_type = locator.get("type", "")
+            url = locator.get("url", "")
+        except AttributeError:  # not a mapping
+            loc_type = url = ""
+        if first_url is None:
+            first_url = url
+        
+        kind = _locator_kind(loc_type)
+        if kind == "agent":
+            agent_url = url
+        elif kind == "api":
+            api_url = url
+    
+    # Fallback to first locator if no specific type matched
+    if not agent_url and first_url:
+        agent_url = first_url
+    return agent_url, api_url
+
+
+def _value_to_py(value) -> Any:
+    """Convert a google.protobuf.Value to plain Python, as MessageToDict would."""
+    kind = value.WhichOneof("kind")
+    if kind == "struct_value":
+        return _struct_to_dict(value.struct_value)
+    if kind == "list_value":
+        return [_value_to_py(v) for v in value.list_value.values]
+    if kind == "number_value":
+        number = value.number_value
+        return int(number) if number.is_integer() else number
+    if kind == "string_value" or kind == "bool_value":
+        return getattr(value, kind)
+    return None
+
+
+def _struct_to_dict(struct) -> Dict[str, Any]:
+    """Convert a google.protobuf.Struct (OASF record data) to a dict without the JSON printer."""
+    return {key: _value_to_py(value) for key, value in struct.fields.items()}
+
 
 class AGNTCYAdapter(BaseRegistryAdapter):
     """
@@ -43,7 +215,8 @@ class AGNTCYAdapter(BaseRegistryAdapter):
         self, 
         server_address: str = "localhost:8888",
         dirctl_path: str = "/opt/homebrew/bin/dirctl",
-        oasf_schema_dir: Optional[str] = None
+        oasf_schema_dir: Optional[str] = None,
+        pool_size: Optional[int] = None
     ):
         super().__init__(registry_id="agntcy")
         
@@ -56,32 +229,97 @@ class AGNTCYAdapter(BaseRegistryAdapter):
         self.server_address = server_address
         self.dirctl_path = dirctl_path
         
-        # Initialize AGNTCY SDK client
-        config = Config(
-            server_address=server_address,
-            dirctl_path=dirctl_path
+        # Pool of AGNTCY SDK clients (one gRPC channel each), used round-robin so
+        # concurrent lookups spread over several connections
+        if pool_size is None:
+            pool_size = int(os.environ.get("AGNTCY_POOL_SIZE", DEFAULT_POOL_SIZE))
+        self._clients = [
+            Client(Config(server_address=server_address, dirctl_path=dirctl_path))
+            for _ in range(max(1, pool_size))
+        ]
+        self._rr = itertools.count()
+        self.client = self._clients[0]
+        self._pull_batcher = (
+            _PullBatcher(lambda refs: self._next_client().pull(refs), PULL_BATCH_SIZE, PULL_BATCH_DELAY)
+            if PULL_BATCH_SIZE > 1 else None
         )
-        self.client = Client(config)
-        print(f"✅ AGNTCY SDK Client initialized at {server_address}")
+        print(f"✅ AGNTCY SDK Client pool ({len(self._clients)}) initialized at {server_address}")
         
         # Initialize SkillMapper for taxonomy mapping
         self.skill_mapper = None
         if SKILL_MAPPER_AVAILABLE:
-            # Clone taxonomy inside the project for self-contained setup
-            default_schema_path = Path(__file__).parent.parent.parent / ".oasf-taxonomy" / "schema"
             schema_dir = oasf_schema_dir or os.environ.get(
                 "OASF_SCHEMA_DIR", 
-                str(default_schema_path)
+                str(_DEFAULT_SCHEMA_PATH)
             )
             schema_path = Path(schema_dir)
             if schema_path.exists():
                 try:
-                    self.skill_mapper = SkillMapper(schema_path)
+                    self.skill_mapper = get_skill_mapper(schema_path)
                     print(f"✅ SkillMapper initialized with taxonomy")
                     print(f"   → {len(self.skill_mapper.leaf_skills)} skills loaded")
                 except Exception as e:
                     print(f"[WARN] SkillMapper initialization failed: {e}")
     
+    def _next_client(self) -> "Client":
+        """Pick the next pooled client (itertools.count is atomic under the GIL)."""
+        return self._clients[next(self._rr) % len(self._clients)]
+    
+    def _search_cid(self, client: "Client", agent_name: str) -> Optional[str]:
+        """Blocking search by name; return the first hit's record CID, or None."""
+        # Build search query
+        search_query = search_v1.RecordQuery(
+            type=search_v1.RecordQueryType.RECORD_QUERY_TYPE_NAME,
+            value=agent_name
+        )
+        
+        search_request = search_v1.SearchRequest(
+            queries=[search_query],
+            limit=1
+        )
+        
+        # Perform search and take the first result
+        search_results = list(client.search(search_request))
+        
+        if not search_results:
+            logger.debug("Agent '%s' not found", agent_name)
+            return None
+        return search_results[0].record_cid
+    
+    def _search_and_pull(self, client: "Client", agent_name: str):
+        """
+        Blocking composite call: search by name, then pull the first hit.
+        
+        Runs in one worker thread so a lookup costs a single hop off the
+        event loop and neither RPC (nor iterating the search stream) blocks it.
+        Returns the pulled record message, or None.
+        """
+        fetched_cid = self._search_cid(client, agent_name)
+        if fetched_cid is None:
+            return None
+        
+        # Pull the record by CID
+        pulled_records = client.pull([core_v1.RecordRef(cid=fetched_cid)])
+        
+        if not pulled_records:
+            logger.warning("Failed to pull record for CID %s", fetched_cid)
+            return None
+        return pulled_records[0]
+    
+    async def _fetch_record(self, client: "Client", agent_name: str):
+        """Search and pull one record, sharing pull RPCs with concurrent lookups when batching."""
+        loop = asyncio.get_running_loop()
+        if self._pull_batcher is None:
+            return await loop.run_in_executor(_AGNTCY_EXEC, self._search_and_pull, client, agent_name)
+        fetched_cid = await loop.run_in_executor(_AGNTCY_EXEC, self._search_cid, client, agent_name)
+        if fetched_cid is None:
+            return None
+        pulled_record = await self._pull_batcher.pull(core_v1.RecordRef(cid=fetched_cid))
+        if not pulled_record:
+            logger.warning("Failed to pull record for CID %s", fetched_cid)
+            return None
+        return pulled_record
+    
     async def query_agent(self, agent_name: str) -> Optional[Dict[str, Any]]:
         """
         Query AGNTCY Directory for an agent by name.
@@ -91,54 +329,27 @@ class AGNTCYAdapter(BaseRegistryAdapter):
         2. Pull the full OASF record
         3. Return as dict
         """
+        client = self._next_client()
         try:
-            # Build search query
-            search_query = search_v1.RecordQuery(
-                type=search_v1.RecordQueryType.RECORD_QUERY_TYPE_NAME,
-                value=agent_name
-            )
-            
-            search_request = search_v1.SearchRequest(
-                queries=[search_query],
-                limit=1
-            )
-            
-            # Perform search (blocking SDK call wrapped in asyncio)
-            search_result_list = await asyncio.to_thread(
-                self.client.search, 
-                search_request
-            )
-            
-            # Convert to list
-            search_results = list(search_result_list)
-            
-            if not search_results:
-                print(f"[AGNTCY] Agent '{agent_name}' not found")
-                return None
-            
-            # Pull the record by CID
-            fetched_cid = search_results[0].record_cid
-            refs = [core_v1.RecordRef(cid=fetched_cid)]
-            pulled_records = self.client.pull(refs)
-            
-            if not pulled_records:
-                print(f"[AGNTCY] Failed to pull record for CID {fetched_cid}")
+            # Search + pull off the event loop
+            pulled_record = await self._fetch_record(client, agent_name)
+            if pulled_record is None:
                 return None
             
-            # Convert to dict
-            pulled_record = pulled_records[0]
-            record_dict = MessageToDict(pulled_record, preserving_proto_field_name=True)
+            # Convert to dict; OASF data is a Struct, read it directly
+            data = getattr(pulled_record, "data", None)
+            if not USE_MESSAGE_TO_DICT and isinstance(data, struct_pb2.Struct):
+                oasf_data = _struct_to_dict(data)
+            else:
+                record_dict = MessageToDict(pulled_record, preserving_proto_field_name=True)
+                # Unwrap 'data' if present
+                oasf_data = record_dict.get("data", record_dict)
             
-            # Unwrap 'data' if present
-            oasf_data = record_dict.get("data", record_dict)
-            
-            print(f"[AGNTCY] ✅ Retrieved agent: {agent_name}")
+            logger.debug("Retrieved agent: %s", agent_name)
             return oasf_data
             
-        except Exception as e:
-            print(f"[AGNTCY] ❌ Error querying agent '{agent_name}': {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error querying agent '%s'", agent_name)
             return None
     
     def translate_to_nanda(self, oasf_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -152,27 +363,15 @@ class AGNTCYAdapter(BaseRegistryAdapter):
         agent_id = f"@{self.registry_id}:{name}"
         
         # Extract locators
-        locators = oasf_data.get("locators", [])
-        agent_url = ""
-        api_url = ""
-        
-        for locator in locators:
-            loc_type = locator.get("type", "").lower() if isinstance(locator, dict) else ""
-            url = locator.get("url", "") if isinstance(locator, dict) else ""
-            
-            if "source" in loc_type or "github" in loc_type:
-                agent_url = url
-            elif "api" in loc_type or "service" in loc_type:
-                api_url = url
-        
-        # Fallback to first locator if no specific type matched
-        if not agent_url and locators:
-            first = locators[0]
-            agent_url = first.get("url", "") if isinstance(first, dict) else ""
+        agent_url, api_url = _classify_locators(oasf_data.get("locators", []))
         
         # Map skills to capabilities with taxonomy
         capabilities = self._map_skills_to_capabilities(oasf_data.get("skills", []))
         
+        last_updated = oasf_data.get("created_at")
+        if last_updated is None:
+            last_updated = datetime.now().isoformat()
+        
         return {
             "agent_id": agent_id,
             "registry_id": self.registry_id,
@@ -182,7 +381,7 @@ class AGNTCYAdapter(BaseRegistryAdapter):
             "capabilities": capabilities,
             "agent_url": agent_url,
             "api_url": api_url,
-            "last_updated": oasf_data.get("created_at", datetime.now().isoformat()),
+            "last_updated": last_updated,
             "schema_version": "nanda-v1",
             "source_schema": "oasf",
             "oasf_schema_version": oasf_data.get("schema_version", "unknown")
@@ -195,35 +394,43 @@ class AGNTCYAdapter(BaseRegistryAdapter):
         If SkillMapper is available, returns full taxonomy dicts.
         Otherwise, returns simple skill name strings.
         """
+        if not skills:
+            return []
         capabilities = []
-        seen = set()
+        append = capabilities.append
+        # Records carry a handful of skills; a list scan beats hashing for those
+        seen = [] if len(skills) <= 8 else set()
+        mark_seen = seen.append if isinstance(seen, list) else seen.add
+        map_capability = self.skill_mapper.map_capability if self.skill_mapper else None
         
         for skill in skills:
-            skill_name = skill.get("name", "") if isinstance(skill, dict) else ""
+            try:
+                skill_name = skill.get("name", "")
+            except AttributeError:  # not a mapping
+                continue
             if not skill_name:
                 continue
+            # Extract leaf skill name (after last /)
+            leaf_name = skill_name.rpartition("/")[2]
             
-            # Try taxonomy mapping first
-            if self.skill_mapper:
-                # Extract leaf skill name (after last /)
-                leaf_name = skill_name.split("/")[-1] if "/" in skill_name else skill_name
-                mapped = self.skill_mapper.map_capability(leaf_name)
+            # Try taxonomy mapping first. SkillMapper already resolves exact leaf
+            # names through a prebuilt name -> payload table and memoizes
+            # map_capability, so no separate index is kept here.
+            if map_capability:
+                mapped = map_capability(leaf_name)
                 
                 if mapped:
                     # Return full taxonomy dict
                     cap_id = mapped.get('skill_id')
                     if cap_id and cap_id not in seen:
-                        capabilities.append(mapped)  # ← Return full dict!
-                        seen.add(cap_id)
+                        append(mapped)  # ← Return full dict!
+                        mark_seen(cap_id)
                         continue
             
             # Fallback: use simple name extraction
-            if "/" in skill_name:
-                skill_name = skill_name.split("/")[-1]
-            
-            if skill_name and skill_name not in seen:
-                capabilities.append(skill_name)
-                seen.add(skill_name)
+            if leaf_name and leaf_name not in seen:
+                append(leaf_name)
+                mark_seen(leaf_name)
         
         return capabilities
     
@@ -232,6 +439,7 @@ class AGNTCYAdapter(BaseRegistryAdapter):
         info = super().get_registry_info()
         info.update({
             "server_address": self.server_address,
+            "pool_size": len(self._clients),
             "skill_mapping": self.skill_mapper is not None,
             "sdk_available": AGNTCY_SDK_AVAILABLE
         })
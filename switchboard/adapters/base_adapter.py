@@ -69,8 +69,15 @@ class BaseRegistryAdapter(ABC):
             return None
         return self.translate_to_nanda(source_data)
     
+    async def aclose(self) -> None:
+        """Release pooled connections held by the adapter (no-op by default)."""
+    
     def get_registry_info(self) -> Dict[str, Any]:
-        """Return metadata about this adapter/registry."""
+        """Return metadata about this adapter/registry.
+        
+        Called for every adapter in turn by /switchboard/registries, so keep it
+        to local state: no network probes.
+        """
         return {
             "registry_id": self.registry_id,
             "adapter_type": self.__class__.__name__,
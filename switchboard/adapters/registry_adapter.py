@@ -1,9 +1,16 @@
 """Local NANDA Registry Adapter - queries the local registry."""
 
+import importlib.util
+import logging
 from typing import Optional, Dict, Any
 from .base_adapter import BaseRegistryAdapter
 import httpx
 
+# HTTP/2 needs the optional 'h2' package (httpx[http2]); otherwise stay on HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+logger = logging.getLogger(__name__)
+
 
 class RegistryAdapter(BaseRegistryAdapter):
     """
@@ -16,32 +23,49 @@ class RegistryAdapter(BaseRegistryAdapter):
     def __init__(self, registry_url: str = "http://localhost:6900"):
         super().__init__(registry_id="nanda")
         self.registry_url = registry_url.rstrip("/")
+        # Pooled client kept for the adapter's lifetime; created lazily on the
+        # switchboard event loop, which it is then bound to
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.registry_url,
+                timeout=10.0,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def query_agent(self, agent_name: str) -> Optional[Dict[str, Any]]:
         """Query the local NANDA registry."""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                # Try the /agents/<id> endpoint first (extended endpoint)
-                response = await client.get(f"{self.registry_url}/agents/{agent_name}")
-                
-                if response.status_code == 404:
-                    # Fallback to /lookup/<id> endpoint
-                    print(f"[RegistryAdapter] /agents/{agent_name} returned 404, trying /lookup")
-                    response = await client.get(f"{self.registry_url}/lookup/{agent_name}")
-                    print(f"[RegistryAdapter] /lookup/{agent_name} returned {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    print(f"[RegistryAdapter] Found agent data: {list(data.keys())}")
-                    return data
-                
-                print(f"[RegistryAdapter] Agent not found: {agent_name}")
-                return None
+            client = self._get_client()
+            # Try the /agents/<id> endpoint first (extended endpoint)
+            response = await client.get(f"/agents/{agent_name}")
+            
+            if response.status_code == 404:
+                # Fallback to /lookup/<id> endpoint
+                logger.debug("/agents/%s returned 404, trying /lookup", agent_name)
+                response = await client.get(f"/lookup/{agent_name}")
+                logger.debug("/lookup/%s returned %s", agent_name, response.status_code)
+            
+            if response.status_code == 200:
+                data = response.json()
+                logger.debug("Found agent data: %s", data.keys())
+                return data
+            
+            logger.debug("Agent not found: %s", agent_name)
+            return None
                 
-        except Exception as e:
-            print(f"[Registry] Error querying local registry: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error querying local registry for %s", agent_name)
             return None
     
     def translate_to_nanda(self, source_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -4,6 +4,13 @@ import os
 from flask import jsonify, request
 from typing import Dict, Any, Optional, Tuple
 import asyncio
+import atexit
+import logging
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 
 # Import adapters
 from .adapters.registry_adapter import RegistryAdapter
@@ -14,6 +21,47 @@ except Exception as e:
     AGNTCY_AVAILABLE = False
     print(f"[Switchboard] AGNTCY adapter not available: {e}")
 
+logger = logging.getLogger(__name__)
+
+
+class _TTLCache:
+    """Small thread-safe LRU cache whose entries expire ttl seconds after insertion."""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+    
+    def set(self, key, value) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def invalidate(self, key=None) -> int:
+        """Drop one key (or everything when key is None); return how many entries were removed."""
+        with self._lock:
+            if key is None:
+                count = len(self._data)
+                self._data.clear()
+                return count
+            return 1 if self._data.pop(key, None) is not None else 0
+
 
 class SwitchboardRouter:
     """
@@ -27,6 +75,12 @@ class SwitchboardRouter:
     
     def __init__(self):
         self.adapters: Dict[str, Any] = {}
+        # Found agents by (registry_id, agent_name), for remote registries only: the
+        # local registry is one localhost hop away and its deletes and status
+        # changes must show up right away. FEDERATION_CACHE_TTL=0 disables caching
+        self._cache = _TTLCache(maxsize=2048, ttl=float(os.getenv("FEDERATION_CACHE_TTL", "60")))
+        # FEDERATION_FANOUT=1: race unprefixed identifiers across every registry
+        self.fanout = os.getenv("FEDERATION_FANOUT") == "1"
         self._init_adapters()
     
     def _init_adapters(self):
@@ -57,7 +111,9 @@ class SwitchboardRouter:
         elif agntcy_ads_url and not AGNTCY_AVAILABLE:
             print("[Switchboard] ⚠️  AGNTCY_ADS_URL set but adapter not available")
     
-    def parse_agent_identifier(self, agent_id: str) -> Tuple[str, str]:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def parse_agent_identifier(agent_id: str) -> Tuple[str, str]:
         """
         Parse agent identifier into (registry_id, agent_name).
         
@@ -69,14 +125,9 @@ class SwitchboardRouter:
         if agent_id.startswith("@"):
             agent_id = agent_id[1:]
         
-        # Check for registry prefix
-        if ":" in agent_id:
-            parts = agent_id.split(":", 1)
-            if len(parts) == 2:
-                return parts[0], parts[1]
-        
-        # Default to local NANDA registry
-        return "nanda", agent_id
+        # Check for registry prefix; default to local NANDA registry
+        registry_id, sep, agent_name = agent_id.partition(":")
+        return (registry_id, agent_name) if sep else ("nanda", agent_id)
     
     async def lookup_agent(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -89,59 +140,205 @@ class SwitchboardRouter:
             NANDA AgentFacts format dict, or None if not found
         """
         registry_id, agent_name = self.parse_agent_identifier(agent_id)
+        cacheable = registry_id != "nanda"
         
-        print(f"[Switchboard] Lookup request: {agent_id}")
-        print(f"[Switchboard] Routing to: {registry_id}, agent: {agent_name}")
-        print(f"[Switchboard] Available adapters: {list(self.adapters.keys())}")
+        cached = self._cache.get((registry_id, agent_name)) if cacheable else None
+        if cached is not None:
+            return cached
         
-        # Get adapter
-        adapter = self.adapters.get(registry_id)
-        if not adapter:
-            print(f"[Switchboard] ❌ Unknown registry: {registry_id}")
-            return None
-        
-        print(f"[Switchboard] Using adapter: {adapter.__class__.__name__}")
+        logger.debug("Lookup request: %s -> registry %s, agent %s (adapters: %s)",
+                     agent_id, registry_id, agent_name, self.adapters.keys())
         
-        # Perform lookup
-        try:
-            result = await adapter.lookup(agent_name)
-            print(f"[Switchboard] Adapter returned: {result is not None}")
-        except Exception as e:
-            print(f"[Switchboard] ❌ Adapter error: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+        if self.fanout and ":" not in agent_id and len(self.adapters) > 1:
+            # No explicit registry prefix: ask every registry, first hit wins
+            result = await self._lookup_first(agent_name)
+        else:
+            # Get adapter
+            adapter = self.adapters.get(registry_id)
+            if not adapter:
+                logger.debug("Unknown registry: %s", registry_id)
+                return None
+            result = await self._lookup_with(adapter, agent_name)
         
         if result:
-            print(f"[Switchboard] ✅ Found agent: {agent_id}")
+            logger.debug("Found agent: %s", agent_id)
+            if cacheable:
+                self._cache.set((registry_id, agent_name), result)
         else:
-            print(f"[Switchboard] ❌ Agent not found: {agent_id}")
+            logger.debug("Agent not found: %s", agent_id)
         
         return result
     
+    async def _lookup_with(self, adapter, agent_name: str) -> Optional[Dict[str, Any]]:
+        """Run one adapter's lookup, treating adapter errors as not found."""
+        try:
+            result = await adapter.lookup(agent_name)
+            logger.debug("%s returned: %s", type(adapter).__name__, result is not None)
+            return result
+        except Exception:
+            logger.exception("Adapter error in %s for %s", type(adapter).__name__, agent_name)
+            return None
+    
+    async def _lookup_first(self, agent_name: str) -> Optional[Dict[str, Any]]:
+        """Query all adapters concurrently; return the first non-empty result and cancel the rest."""
+        pending = {
+            asyncio.create_task(self._lookup_with(adapter, agent_name))
+            for adapter in self.adapters.values()
+        }
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result:
+                        return result
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def aclose(self) -> None:
+        """Close every adapter's pooled connections."""
+        for adapter in self.adapters.values():
+            await adapter.aclose()
+    
+    def invalidate_cache(self, agent_id: Optional[str] = None) -> int:
+        """Drop the cached lookup for agent_id, or every cached lookup; return the count removed."""
+        if agent_id is None:
+            return self._cache.invalidate()
+        return self._cache.invalidate(self.parse_agent_identifier(agent_id))
+    
     def list_registries(self) -> Dict[str, Any]:
         """List all available registries and their status."""
         return {
             "registries": [
-                adapter.get_registry_info() 
-                for adapter in self.adapters.values()
+                self._registry_info(registry_id, adapter)
+                for registry_id, adapter in self.adapters.items()
             ],
             "count": len(self.adapters)
         }
+    
+    @staticmethod
+    def _registry_info(registry_id: str, adapter) -> Dict[str, Any]:
+        """Adapter metadata; an adapter whose info fails is listed with status "unknown"."""
+        try:
+            return adapter.get_registry_info()
+        except Exception as e:
+            logger.warning("Registry info failed for %s: %s", registry_id, e)
+            return {
+                "registry_id": registry_id,
+                "adapter_type": adapter.__class__.__name__,
+                "status": "unknown"
+            }
 
 
 # Global router instance
 _router: Optional[SwitchboardRouter] = None
+_router_lock = threading.Lock()
 
 
 def get_router() -> SwitchboardRouter:
-    """Get or create the global switchboard router."""
+    """Get or create the global switchboard router (safe under threaded Flask)."""
     global _router
     if _router is None:
-        _router = SwitchboardRouter()
+        with _router_lock:
+            if _router is None:
+                _router = SwitchboardRouter()
     return _router
 
 
+# Long-lived event loop shared by all switchboard requests, so adapter connection
+# pools and keep-alive connections survive between lookups
+LOOKUP_TIMEOUT = 30.0
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Get or start the background event loop that runs switchboard coroutines."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="switchboard-loop", daemon=True).start()
+            atexit.register(_shutdown_loop, _loop)
+        return _loop
+
+
+def _shutdown_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """Close adapter connection pools on the loop that owns them, then stop it."""
+    if loop.is_closed() or not loop.is_running():
+        return
+    if _router is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(_router.aclose(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning("Error closing adapters: %s", e)
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def run_coroutine(coro, timeout: float = LOOKUP_TIMEOUT):
+    """Run coro on the switchboard loop from sync (Flask) code and wait for its result."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+def _warm_up() -> None:
+    """Create the event loop and router ahead of the first request."""
+    try:
+        get_event_loop()
+        get_router()
+    except Exception:
+        logger.exception("Switchboard warm-up failed")
+
+
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+
+def _start_warm_up() -> None:
+    """Start the background warm-up, once per process."""
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=_warm_up, name="switchboard-warmup", daemon=True).start()
+
+
+def is_ready() -> bool:
+    """True once the router (and with it every adapter) has been created.
+    
+    The first probe in a process that has not warmed up yet (a forked worker,
+    see _reset_after_fork) starts the warm-up.
+    """
+    if _router is None:
+        _start_warm_up()
+        return False
+    return True
+
+
+def _reset_after_fork() -> None:
+    """Drop inherited switchboard state in a forked child (e.g. a gunicorn --preload worker).
+    
+    The loop thread does not survive fork and the adapters' connections belong
+    to the parent, so both are rebuilt lazily in the child.
+    """
+    global _router, _loop, _router_lock, _loop_lock, _warm_up_started, _warm_up_lock
+    atexit.unregister(_shutdown_loop)  # the parent's loop is not running here
+    _router = _loop = None
+    _router_lock, _loop_lock, _warm_up_lock = threading.Lock(), threading.Lock(), threading.Lock()
+    _warm_up_started = False
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
 def register_switchboard_routes(app):
     """
     Register switchboard endpoints with Flask app.
@@ -149,20 +346,25 @@ def register_switchboard_routes(app):
     Adds:
     - GET /switchboard/lookup/<agent_id>
     - GET /switchboard/registries
+    - POST /switchboard/cache/invalidate
+    
+    The router (adapters, SDK channels, skill taxonomy) and the lookup event
+    loop are warmed up on a background thread, so the server answers health
+    checks right away; see is_ready(). Lookups that arrive first wait for the
+    router rather than fail.
     """
+    _start_warm_up()
     
     @app.route('/switchboard/lookup/<agent_id>', methods=['GET'])
     def switchboard_lookup(agent_id):
         """Cross-registry agent lookup endpoint."""
         router = get_router()
         
-        # Run async lookup in sync context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # Run async lookup on the shared background loop
         try:
-            result = loop.run_until_complete(router.lookup_agent(agent_id))
-        finally:
-            loop.close()
+            result = run_coroutine(router.lookup_agent(agent_id))
+        except concurrent.futures.TimeoutError:
+            return jsonify({"error": f"Lookup timed out: {agent_id}"}), 504
         
         if not result:
             return jsonify({"error": f"Agent not found: {agent_id}"}), 404
@@ -175,7 +377,15 @@ def register_switchboard_routes(app):
         router = get_router()
         return jsonify(router.list_registries())
     
+    @app.route('/switchboard/cache/invalidate', methods=['POST'])
+    def switchboard_cache_invalidate():
+        """Drop cached lookups: one agent with {"agent_id": ...}, otherwise all of them."""
+        data = request.get_json(silent=True) or {}
+        removed = get_router().invalidate_cache(data.get("agent_id"))
+        return jsonify({"status": "success", "invalidated": removed})
+    
     print("[Switchboard] ✅ Switchboard routes registered")
     print("[Switchboard]    - GET /switchboard/lookup/<agent_id>")
     print("[Switchboard]    - GET /switchboard/registries")
+    print("[Switchboard]    - POST /switchboard/cache/invalidate")
 
@@ -2,174 +2,298 @@
 
 import sys
 import os
+import compileall
 import time
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import signal
+import socket
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+import pytest
 
-# Test ports
-REGISTRY_PORT = 5432
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+REGISTRY_PATH = REPO_ROOT / "registry.py"
+
+sys.path.insert(0, str(REPO_ROOT))
+
+# registry.py itself is always compiled from source, but the switchboard modules it
+# imports are cached; warm that cache once so concurrently booting servers don't all
+# compile them
+compileall.compile_dir(str(REPO_ROOT / "switchboard"), quiet=1)
+
+# Test ports: registries get a kernel-picked free port (see _free_port)
 DIRCTL_PORT = 8888  # Standard dirctl port
 
+# Shared session: readiness polls and test calls reuse keep-alive connections
+# (pool sized for the concurrent script runner)
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
+def _port_open(port, timeout=0.05):
+    """Cheap TCP probe: a closed localhost port fails in ~1ms instead of an HTTP timeout."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        return sock.connect_ex(('localhost', port)) == 0
+
+
+def _free_port():
+    """Let the kernel pick an unused localhost port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+def _ensure_port_free(port):
+    """Fail fast if something already listens on port, instead of polling a server that can't bind."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(('localhost', port))
+        except OSError:
+            raise RuntimeError(f"Port {port} already in use") from None
+
+
+# The only variables a test registry inherits; anything else (MONGODB_URI, FEDERATION_*,
+# ...) would let the CI environment change what the tests exercise
+_FORWARDED_ENV = ('PATH', 'HOME', 'LANG', 'PYTHONPATH', 'VIRTUAL_ENV', 'LD_LIBRARY_PATH', 'DIRCTL_PATH')
+
 
 def start_registry_server(port, enable_federation=False, agntcy_ads_url=None):
     """Start registry.py as a real server."""
-    env = os.environ.copy()
-    env['PORT'] = str(port)
-    env['TEST_MODE'] = '1'  # In-memory mode
-    env['ENABLE_FEDERATION'] = 'true' if enable_federation else 'false'
+    env = {
+        **{name: os.environ[name] for name in _FORWARDED_ENV if name in os.environ},
+        'PORT': str(port),
+        'TEST_MODE': '1',  # In-memory mode
+        'ENABLE_FEDERATION': 'true' if enable_federation else 'false',
+    }
+    _ensure_port_free(port)
     if agntcy_ads_url:
         env['AGNTCY_ADS_URL'] = agntcy_ads_url
     
-    registry_path = Path(__file__).parent.parent.parent / "registry.py"
-    
-    process = subprocess.Popen(
-        [sys.executable, str(registry_path)],
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        preexec_fn=os.setsid  # Create process group for clean shutdown
-    )
+    # Popen already launches via posix_spawn/vfork where it can; the Popen object is
+    # kept for poll()/wait() in the readiness loop and stop_server.
+    # Server output goes to a log file: nothing drains a PIPE, so a chatty server would
+    # block once the pipe buffer filled
+    log_path = Path(tempfile.gettempdir()) / f"nanda-registry-{port}.log"
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen(
+            [sys.executable, str(REGISTRY_PATH)],
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True  # Own process group for clean shutdown, without preexec_fn
+        )
     
-    # Wait for server to start
-    max_wait = 10
-    for i in range(max_wait):
-        try:
-            response = requests.get(f"http://localhost:{port}/health", timeout=1)
-            if response.status_code == 200:
-                print(f"✅ Registry server started on port {port}")
-                return process
-        except:
-            time.sleep(1)
+    # Wait for server to be ready (switchboard warmed up): poll fast at first, then back off (25ms → 200ms)
+    deadline = time.monotonic() + 10
+    delay = 0.025
+    while time.monotonic() < deadline and process.poll() is None:
+        if _port_open(port):
+            try:
+                response = _session.get(f"http://localhost:{port}/ready", timeout=0.25)
+                if response.status_code == 200:
+                    print(f"✅ Registry server started on port {port}")
+                    return process
+            except requests.RequestException:
+                pass
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
     
     # Failed to start
     process.kill()
-    raise RuntimeError(f"Registry server failed to start on port {port}")
+    raise RuntimeError(f"Registry server failed to start on port {port} (log: {log_path})")
 
 
 def stop_server(process):
-    """Stop a server process."""
+    """Stop a server process: SIGTERM its process group, then SIGKILL after 0.5s."""
+    if process.poll() is not None:
+        return  # Already exited; don't signal a reused pid/pgid
     try:
-        os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-        process.wait(timeout=5)
-    except:
+        pgid = os.getpgid(process.pid)
+        os.killpg(pgid, signal.SIGTERM)
+        try:
+            process.wait(timeout=0.5)
+        except subprocess.TimeoutExpired:
+            os.killpg(pgid, signal.SIGKILL)
+            process.wait(timeout=1)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
         process.kill()
 
 
+@contextmanager
+def running_registry(port=0, enable_federation=False, agntcy_ads_url=None):
+    """Run a registry server for the duration of the block; yields its base URL.
+
+    port=0 picks a free port.
+    """
+    port = port or _free_port()
+    process = start_registry_server(port, enable_federation, agntcy_ads_url)
+    try:
+        yield f"http://localhost:{port}"
+    finally:
+        stop_server(process)
+
+
+def make_client():
+    """In-process Flask test client for registry.py (TEST_MODE, no federation).
+
+    Only for tests that talk to the registry alone: federation lookups call back
+    into the registry over HTTP and the batch scripts run as separate processes,
+    so those still need a real server.
+    """
+    # Importing registry runs configure() from the environment; without TEST_MODE
+    # that first pass would wait out MongoDB server selection. Only the import sees
+    # it, so later importers and configure() calls keep the real environment
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('TEST_MODE', '1')
+        import registry
+    return registry.create_app(test_mode=True).test_client()
+
+
+@pytest.fixture(scope="module")
+def registry_client():
+    """Shared in-process client for registry.py without federation."""
+    yield make_client()
+    import registry
+    registry.reset_state()
+
+
+@pytest.fixture(scope="module")
+def plain_registry_url():
+    """One registry without federation, shared by the tests in this module."""
+    with running_registry(enable_federation=False) as url:
+        yield url
+
+
+@pytest.fixture(scope="module")
+def registry_url():
+    """One federation-enabled registry, shared by the tests in this module."""
+    with running_registry(enable_federation=True) as url:
+        yield url
+
+
 def check_dirctl_running():
     """Check if dirctl is running on standard port."""
-    # dirctl uses gRPC, not HTTP, so check if port is listening
-    import socket
+    # dirctl uses gRPC, not HTTP, so check if port is listening; 200ms is plenty on localhost
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(2)
-        result = sock.connect_ex(('localhost', DIRCTL_PORT))
-        sock.close()
-        return result == 0
-    except:
+        return _port_open(DIRCTL_PORT, timeout=0.2)
+    except OSError:
         return False
 
 
-def test_registry_starts_without_federation():
-    """Test that registry.py starts as a real server without federation."""
-    process = None
-    try:
-        process = start_registry_server(REGISTRY_PORT, enable_federation=False)
-        
-        # Make real HTTP request
-        response = requests.get(f"http://localhost:{REGISTRY_PORT}/health")
-        assert response.status_code == 200
-        
-        data = response.json()
-        assert data['status'] == 'ok'
-        
-        print("✅ Registry starts without federation")
-    finally:
-        if process:
-            stop_server(process)
+def test_registry_starts_without_federation(registry_client):
+    """Test that registry.py serves requests without federation."""
+    response = registry_client.get("/health")
+    assert response.status_code == 200
+    
+    data = response.get_json()
+    assert data['status'] == 'ok'
+    
+    print("✅ Registry starts without federation")
 
 
-def test_registry_starts_with_federation():
+def test_registry_starts_with_federation(registry_url):
     """Test that registry.py starts with federation enabled."""
-    process = None
-    try:
-        process = start_registry_server(REGISTRY_PORT + 1, enable_federation=True)
-        
-        # Check federation endpoints exist
-        response = requests.get(f"http://localhost:{REGISTRY_PORT + 1}/switchboard/registries")
-        assert response.status_code == 200
-        
-        data = response.json()
-        assert 'registries' in data
-        assert len(data['registries']) > 0
-        
-        # Should have at least NANDA registry
-        registry_ids = [r['registry_id'] for r in data['registries']]
-        assert 'nanda' in registry_ids
-        
-        print("✅ Registry starts with federation enabled")
-    finally:
-        if process:
-            stop_server(process)
+    # Check federation endpoints exist
+    response = _session.get(f"{registry_url}/switchboard/registries")
+    assert response.status_code == 200
+    
+    data = response.json()
+    assert 'registries' in data
+    assert len(data['registries']) > 0
+    
+    # Should have at least NANDA registry
+    registry_ids = [r['registry_id'] for r in data['registries']]
+    assert 'nanda' in registry_ids
+    
+    print("✅ Registry starts with federation enabled")
 
 
-def test_register_and_lookup_local_agent():
+def test_register_and_lookup_local_agent(registry_url):
     """Test registering an agent and looking it up via federation."""
-    process = None
-    try:
-        process = start_registry_server(REGISTRY_PORT + 2, enable_federation=True)
-        base_url = f"http://localhost:{REGISTRY_PORT + 2}"
-        
-        # Register a test agent
-        agent_payload = {
-            "agent_id": "test-agent-001",
-            "agent_url": "http://test.example.com/agent",
-            "api_url": "http://test.example.com/api"
-        }
-        
-        response = requests.post(f"{base_url}/register", json=agent_payload)
-        assert response.status_code == 200
-        print(f"  → Registered agent: test-agent-001")
-        
-        # Lookup via federation (local registry)
-        response = requests.get(f"{base_url}/switchboard/lookup/test-agent-001")
-        
-        if response.status_code != 200:
-            print(f"  → Federation lookup failed: {response.status_code}")
-            print(f"  → Response: {response.text[:500]}")
-            # Try direct registry lookup to verify agent exists
-            direct_response = requests.get(f"{base_url}/lookup/test-agent-001")
-            print(f"  → Direct lookup status: {direct_response.status_code}")
-            
-        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text[:200]}"
-        
-        data = response.json()
-        assert data['agent_id'] == 'test-agent-001'
-        assert data['registry_id'] == 'nanda'
-        assert data['agent_url'] == agent_payload['agent_url']
-        
-        print("✅ Register and lookup local agent via federation")
-    finally:
-        if process:
-            stop_server(process)
+    base_url = registry_url
+    # Namespaced id: the registry server is shared with other tests
+    agent_id = f"test-agent-{uuid.uuid4().hex[:8]}"
+    
+    # Register a test agent
+    agent_payload = {
+        "agent_id": agent_id,
+        "agent_url": "http://test.example.com/agent",
+        "api_url": "http://test.example.com/api"
+    }
+    
+    response = _session.post(f"{base_url}/register", json=agent_payload)
+    assert response.status_code == 200
+    print(f"  → Registered agent: {agent_id}")
+    
+    # Lookup via federation (local registry)
+    response = _session.get(f"{base_url}/switchboard/lookup/{agent_id}")
+    
+    if response.status_code != 200:
+        print(f"  → Federation lookup failed: {response.status_code}")
+        print(f"  → Response: {response.text[:500]}")
+        # Try direct registry lookup to verify agent exists
+        direct_response = _session.get(f"{base_url}/lookup/{agent_id}")
+        print(f"  → Direct lookup status: {direct_response.status_code}")
+        
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text[:200]}"
+    
+    data = response.json()
+    assert data['agent_id'] == agent_id
+    assert data['registry_id'] == 'nanda'
+    assert data['agent_url'] == agent_payload['agent_url']
+    
+    print("✅ Register and lookup local agent via federation")
 
 
+def test_deleted_local_agent_is_not_served_from_cache(registry_url):
+    """Test that a local agent deleted after a federation lookup is no longer found."""
+    agent_id = f"test-agent-{uuid.uuid4().hex[:8]}"
+    
+    response = _session.post(f"{registry_url}/register", json={
+        "agent_id": agent_id,
+        "agent_url": "http://test.example.com/agent",
+        "api_url": "http://test.example.com/api",
+    })
+    assert response.status_code == 200
+    
+    response = _session.get(f"{registry_url}/switchboard/lookup/{agent_id}")
+    assert response.status_code == 200
+    
+    response = _session.delete(f"{registry_url}/agents/{agent_id}")
+    assert response.status_code == 200
+    
+    response = _session.get(f"{registry_url}/switchboard/lookup/{agent_id}")
+    assert response.status_code == 404, response.text[:200]
+    
+    print("✅ Deleted local agent is not served from the lookup cache")
+
+
+@pytest.mark.skipif(not check_dirctl_running(),
+                    reason=f"dirctl not running on port {DIRCTL_PORT} (start it with: dirctl start)")
 def test_agntcy_federation_with_dirctl():
     """Test federation with real AGNTCY ADS (dirctl) - COMPLETE FLOW with SkillMapper."""
     import json
-    import tempfile
-    
-    dirctl_running = check_dirctl_running()
-    
-    if not dirctl_running:
-        print("⚠️  Skipping: dirctl not running on port 8888")
-        print("   To run this test: dirctl start")
-        return "skip"
     
+    # Boot the registry while the fixture is checked/pushed into ADS; the two
+    # only meet at Step 3, so the wait is max(boot, push) instead of the sum
+    registry_port = _free_port()
+    boot = ThreadPoolExecutor(max_workers=1)
+    registry_future = boot.submit(
+        start_registry_server,
+        registry_port,
+        enable_federation=True,
+        agntcy_ads_url=f"localhost:{DIRCTL_PORT}"
+    )
+    boot.shutdown(wait=False)
     process = None
     try:
         print(f"  → dirctl detected on port {DIRCTL_PORT}")
@@ -229,16 +353,12 @@ def test_agntcy_federation_with_dirctl():
             traceback.print_exc()
             raise
         
-        # Step 2: Start registry with AGNTCY federation
-        process = start_registry_server(
-            REGISTRY_PORT + 3, 
-            enable_federation=True,
-            agntcy_ads_url=f"localhost:{DIRCTL_PORT}"
-        )
-        base_url = f"http://localhost:{REGISTRY_PORT + 3}"
+        # Step 2: Wait for the registry (AGNTCY federation) started above
+        process = registry_future.result()
+        base_url = f"http://localhost:{registry_port}"
         
         # Step 3: Verify AGNTCY adapter is registered
-        response = requests.get(f"{base_url}/switchboard/registries")
+        response = _session.get(f"{base_url}/switchboard/registries")
         data = response.json()
         registry_ids = [r['registry_id'] for r in data['registries']]
         
@@ -250,8 +370,7 @@ def test_agntcy_federation_with_dirctl():
             print("     1. AGNTCY SDK not installed: pip install agntcy-dir-sdk")
             print("     2. protobuf not installed: pip install protobuf")
             print("     3. Check registry logs for adapter initialization errors")
-            print("  → Skipping test (dirctl running but SDK unavailable)")
-            return "skip"
+            pytest.skip("dirctl running but AGNTCY adapter unavailable")
         
         print(f"  → ✅ AGNTCY adapter registered")
         
@@ -261,14 +380,13 @@ def test_agntcy_federation_with_dirctl():
         print(f"  → Registry: agntcy (AGNTCY ADS)")
         print(f"  → Endpoint: {base_url}/switchboard/lookup/{agent_identifier}")
         
-        response = requests.get(f"{base_url}/switchboard/lookup/{agent_identifier}")
+        response = _session.get(f"{base_url}/switchboard/lookup/{agent_identifier}")
         
         if response.status_code != 200:
             print(f"  ❌ Federation lookup failed: {response.status_code}")
             print(f"  Response: {response.text[:300]}")
             # Don't fail - might be SDK or other issues
-            print("⚠️  Federation registered but lookup failed (check AGNTCY SDK)")
-            return "skip"
+            pytest.skip("Federation registered but lookup failed (check AGNTCY SDK)")
         
         retrieved_agent_data = response.json()
         
@@ -338,106 +456,72 @@ def test_agntcy_federation_with_dirctl():
         print("="*70)
         
     except subprocess.TimeoutExpired:
-        print("⚠️  dirctl command timed out")
-        return "skip"
+        pytest.skip("dirctl command timed out")
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
         import traceback
         traceback.print_exc()
         raise
     finally:
+        # The registry may still be booting (or have failed to) if Step 1 raised
+        try:
+            process = registry_future.result()
+        except Exception:
+            process = None
         if process:
             stop_server(process)
 
 
-def test_batch_export_and_sync():
+def test_batch_export_and_sync(plain_registry_url):
     """Test batch export NANDA → OASF and sync OASF → NANDA."""
-    process = None
-    try:
-        process = start_registry_server(REGISTRY_PORT + 4, enable_federation=False)
-        base_url = f"http://localhost:{REGISTRY_PORT + 4}"
-        
-        # Register test agents
-        for i in range(3):
-            agent_payload = {
-                "agent_id": f"batch-test-{i}",
-                "agent_url": f"http://test.example.com/agent-{i}",
-                "api_url": f"http://test.example.com/api-{i}"
-            }
-            requests.post(f"{base_url}/register", json=agent_payload)
-        
-        print(f"  → Registered 3 test agents")
+    base_url = plain_registry_url
+    batch_prefix = f"batch-test-{uuid.uuid4().hex[:8]}"
+    # Register test agents in one batch request
+    agents = [
+        {
+            "agent_id": f"{batch_prefix}-{i}",
+            "agent_url": f"http://test.example.com/agent-{i}",
+            "api_url": f"http://test.example.com/api-{i}"
+        }
+        for i in range(3)
+    ]
+    response = _session.post(f"{base_url}/register", json={"agents": agents})
+    assert response.status_code == 200
+    assert len(response.json()["registered"]) == 3
+    
+    print(f"  → Registered 3 test agents")
+    
+    # Export to OASF files
+    with tempfile.TemporaryDirectory() as tmpdir:
+        export_script = REPO_ROOT / "agntcy-interop" / "batch" / "export_nanda_to_agntcy.py"
+        
+        result = subprocess.run(
+            [
+                sys.executable, str(export_script),
+                "--registry-url", base_url,
+                "--out-dir", tmpdir,
+                "--limit", "3",
+                "--dry-run"  # Just test the export logic
+            ],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
         
-        # Export to OASF files
-        import tempfile
-        with tempfile.TemporaryDirectory() as tmpdir:
-            export_script = Path(__file__).parent.parent.parent / "agntcy-interop" / "batch" / "export_nanda_to_agntcy.py"
-            
-            result = subprocess.run(
-                [
-                    sys.executable, str(export_script),
-                    "--registry-url", base_url,
-                    "--out-dir", tmpdir,
-                    "--limit", "3",
-                    "--dry-run"  # Just test the export logic
-                ],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if result.returncode == 0:
-                print(f"  → Export script ran successfully")
-                print("✅ Batch export works")
-            else:
-                print(f"⚠️  Export script failed: {result.stderr[:200]}")
-                print("⚠️  Batch export needs investigation")
-    finally:
-        if process:
-            stop_server(process)
+        if result.returncode == 0:
+            print(f"  → Export script ran successfully")
+            print("✅ Batch export works")
+        else:
+            print(f"⚠️  Export script failed: {result.stderr[:200]}")
+            print("⚠️  Batch export needs investigation")
 
 
 if __name__ == "__main__":
-    print("\n" + "="*70)
-    print("Running REAL End-to-End Integration Tests (with actual servers)")
-    print("="*70)
-    print("\n📌 CRITICAL TEST: test_agntcy_federation_with_dirctl")
-    print("   This tests the complete ADS → NANDA flow with SkillMapper")
-    print("   Prerequisites: dirctl running on port 8888, AGNTCY SDK installed")
-    print("="*70 + "\n")
-    
-    tests = [
-        test_registry_starts_without_federation,
-        test_registry_starts_with_federation,
-        test_register_and_lookup_local_agent,
-        test_agntcy_federation_with_dirctl,  # ⭐ THE CRITICAL TEST
-        test_batch_export_and_sync,
-    ]
-    
-    passed = 0
-    failed = 0
-    skipped = 0
-    
-    for test in tests:
-        print(f"\n🔬 {test.__name__}")
-        try:
-            result = test()
-            if result == "skip":
-                skipped += 1
-                print(f"   ⏭️  Skipped")
-            else:
-                passed += 1
-        except Exception as e:
-            print(f"❌ {test.__name__} failed: {e}")
-            import traceback
-            traceback.print_exc()
-            failed += 1
-    
-    print("\n" + "="*70)
-    print(f"Results: {passed} passed, {failed} failed, {skipped} skipped")
-    if skipped > 0:
-        print(f"\n⚠️  {skipped} test(s) skipped - see requirements above")
-    print("="*70)
+    # Run through pytest for fixtures, skips and timings; with pytest-xdist
+    # installed the tests are also spread across CPUs
+    import importlib.util
     
-    sys.exit(0 if failed == 0 else 1)
-
+    args = [__file__, "-v", "-s"]
+    if importlib.util.find_spec("xdist") is not None:
+        args += ["-n", "auto"]
+    sys.exit(pytest.main(args))
@@ -211,6 +211,237 @@ def test_skillmapper_integration_with_mock_data():
     print("✅ SkillMapper handles missing schema gracefully")
 
 
+def test_run_coroutine_reuses_background_loop():
+    """Test that switchboard coroutines share one long-lived event loop."""
+    import asyncio
+    from switchboard.switchboard_routes import run_coroutine
+    
+    async def current_loop():
+        return asyncio.get_running_loop()
+    
+    first = run_coroutine(current_loop())
+    assert run_coroutine(current_loop()) is first
+    assert first.is_running()
+    
+    print("✅ Switchboard event loop is reused across lookups")
+
+
+def test_reset_after_fork_rebuilds_loop_and_router():
+    """Test that a forked worker drops the parent's loop and router and warms up its own."""
+    import asyncio
+    import time
+    from switchboard import switchboard_routes
+    
+    async def current_loop():
+        return asyncio.get_running_loop()
+    
+    parent_loop = switchboard_routes.run_coroutine(current_loop())
+    switchboard_routes._reset_after_fork()  # what os.register_at_fork runs in the child
+    assert switchboard_routes._router is None
+    
+    child_loop = switchboard_routes.run_coroutine(current_loop())
+    assert child_loop is not parent_loop and child_loop.is_running()
+    
+    deadline = time.monotonic() + 5
+    while not switchboard_routes.is_ready() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert switchboard_routes.is_ready()
+    parent_loop.call_soon_threadsafe(parent_loop.stop)
+    
+    print("✅ Switchboard state is rebuilt after fork")
+
+
+def test_struct_to_dict_matches_message_to_dict():
+    """Test the direct Struct conversion used for pulled OASF records."""
+    import pytest
+    pytest.importorskip("google.protobuf")
+    from google.protobuf import struct_pb2
+    from google.protobuf.json_format import MessageToDict
+    from switchboard.adapters.agntcy_adapter import _struct_to_dict
+    
+    data = struct_pb2.Struct()
+    data.update({
+        "name": "helper-agent",
+        "version": "v1.0.0",
+        "skills": [{"name": "natural_language_processing/text_completion", "id": 10201}],
+        "locators": [{"type": "source_code", "url": "https://github.com/test/agent"}],
+        "score": 0.5,
+        "deprecated": False,
+        "annotations": None,
+    })
+    
+    assert _struct_to_dict(data) == MessageToDict(data)
+    
+    print("✅ Struct conversion matches MessageToDict")
+
+
+def test_router_caches_found_agents():
+    """Test that repeated remote lookups are served from the router's TTL cache."""
+    from switchboard.switchboard_routes import SwitchboardRouter, run_coroutine
+    from switchboard.adapters.base_adapter import BaseRegistryAdapter
+    
+    class CountingAdapter(BaseRegistryAdapter):
+        def __init__(self, registry_id):
+            super().__init__(registry_id=registry_id)
+            self.calls = 0
+        
+        async def query_agent(self, agent_name):
+            self.calls += 1
+            return {"agent_id": agent_name} if agent_name != "missing" else None
+        
+        def translate_to_nanda(self, source_data):
+            return dict(source_data)
+    
+    router = SwitchboardRouter()
+    adapter = router.adapters["agntcy"] = CountingAdapter("agntcy")
+    local = router.adapters["nanda"] = CountingAdapter("nanda")
+    
+    assert run_coroutine(router.lookup_agent("@agntcy:helper"))["agent_id"] == "helper"
+    assert run_coroutine(router.lookup_agent("agntcy:helper"))["agent_id"] == "helper"
+    assert adapter.calls == 1
+    
+    # Misses are not cached
+    assert run_coroutine(router.lookup_agent("@agntcy:missing")) is None
+    assert run_coroutine(router.lookup_agent("@agntcy:missing")) is None
+    assert adapter.calls == 3
+    
+    assert router.invalidate_cache("@agntcy:helper") == 1
+    run_coroutine(router.lookup_agent("@agntcy:helper"))
+    assert adapter.calls == 4
+    
+    # The local registry is always asked, so deletes show up right away
+    run_coroutine(router.lookup_agent("helper"))
+    run_coroutine(router.lookup_agent("@nanda:helper"))
+    assert local.calls == 2
+    
+    print("✅ Switchboard lookup cache works")
+
+
+def test_router_fanout_returns_first_hit():
+    """Test that FEDERATION_FANOUT races unprefixed lookups across registries."""
+    import asyncio
+    from switchboard.switchboard_routes import SwitchboardRouter, run_coroutine
+    from switchboard.adapters.base_adapter import BaseRegistryAdapter
+    
+    class StubAdapter(BaseRegistryAdapter):
+        def __init__(self, registry_id, delay, known):
+            super().__init__(registry_id=registry_id)
+            self.delay = delay
+            self.known = known
+            self.cancelled = False
+        
+        async def query_agent(self, agent_name):
+            try:
+                await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+            return {"agent_id": agent_name, "registry_id": self.registry_id} if self.known else None
+        
+        def translate_to_nanda(self, source_data):
+            return dict(source_data)
+    
+    router = SwitchboardRouter()
+    router.fanout = True
+    router.adapters = {
+        "nanda": StubAdapter("nanda", 0.0, known=False),
+        "agntcy": StubAdapter("agntcy", 0.01, known=True),
+        "slow": StubAdapter("slow", 5.0, known=True),
+    }
+    
+    result = run_coroutine(router.lookup_agent("helper"), timeout=2)
+    assert result["registry_id"] == "agntcy"
+    run_coroutine(asyncio.sleep(0))
+    assert router.adapters["slow"].cancelled
+    
+    # Explicit prefixes still route to a single registry
+    assert run_coroutine(router.lookup_agent("@nanda:other")) is None
+    
+    print("✅ Switchboard fan-out lookup works")
+
+
+def test_list_registries_reports_failing_adapter_as_unknown():
+    """Test that one adapter's failing metadata doesn't break /switchboard/registries."""
+    from switchboard.switchboard_routes import SwitchboardRouter
+    from switchboard.adapters.registry_adapter import RegistryAdapter
+    
+    class BrokenAdapter(RegistryAdapter):
+        def get_registry_info(self):
+            raise RuntimeError("boom")
+    
+    router = SwitchboardRouter()
+    router.adapters["broken"] = BrokenAdapter("http://localhost:1")
+    
+    data = router.list_registries()
+    assert data["count"] == len(data["registries"])
+    assert data["registries"][0]["status"] == "active"
+    assert data["registries"][-1] == {
+        "registry_id": "broken",
+        "adapter_type": "BrokenAdapter",
+        "status": "unknown"
+    }
+    
+    print("✅ Registry listing tolerates failing adapters")
+
+
+def test_agntcy_translate_classifies_locators():
+    """Test AGNTCYAdapter locator classification (adapter built without the SDK client)."""
+    from switchboard.adapters.agntcy_adapter import AGNTCYAdapter
+    
+    adapter = AGNTCYAdapter.__new__(AGNTCYAdapter)
+    adapter.registry_id = "agntcy"
+    adapter.skill_mapper = None
+    
+    result = adapter.translate_to_nanda({
+        "name": "helper-agent",
+        "skills": [{"name": "natural_language_processing/text_completion"}],
+        "locators": [
+            {"type": "API_Service", "url": "https://api.example.com"},
+            {"type": "api_source_code", "url": "https://github.com/test/agent"},
+            {"type": "docker_image", "url": "docker://test/agent"},
+        ],
+    })
+    
+    assert result["agent_url"] == "https://github.com/test/agent"
+    assert result["api_url"] == "https://api.example.com"
+    assert result["capabilities"] == ["text_completion"]
+    
+    print("✅ AGNTCY locator classification works")
+
+
+def test_pull_batcher_coalesces_concurrent_pulls():
+    """Test that concurrent AGNTCY pulls share one batched pull call."""
+    import asyncio
+    from switchboard.adapters.agntcy_adapter import _PullBatcher
+    
+    batches = []
+    
+    def pull(refs):
+        batches.append(list(refs))
+        if "bad" in refs and len(refs) > 1:
+            raise RuntimeError("one bad ref fails the whole batch")
+        if "bad" in refs:
+            raise KeyError("bad")
+        return [f"record-{ref}" for ref in refs]
+    
+    async def scenario():
+        batcher = _PullBatcher(pull, max_batch=32, max_delay=0.05)
+        records = await asyncio.gather(*(batcher.pull(f"cid{i}") for i in range(5)))
+        assert records == [f"record-cid{i}" for i in range(5)]
+        assert batches == [[f"cid{i}" for i in range(5)]]
+        
+        # A failing batch falls back to per-ref pulls
+        batches.clear()
+        results = await asyncio.gather(batcher.pull("ok"), batcher.pull("bad"), return_exceptions=True)
+        assert results[0] == "record-ok"
+        assert isinstance(results[1], KeyError)
+        assert sorted(map(len, batches)) == [1, 1, 2]
+    
+    asyncio.run(scenario())
+    
+    print("✅ AGNTCY pull micro-batching works")
+
+
 if __name__ == "__main__":
     # Run tests manually
     print("\n" + "="*60)
@@ -225,6 +456,14 @@ if __name__ == "__main__":
         test_federation_router_initialization,
         test_federation_router_parse_identifier,
         test_skillmapper_integration_with_mock_data,
+        test_run_coroutine_reuses_background_loop,
+        test_reset_after_fork_rebuilds_loop_and_router,
+        test_struct_to_dict_matches_message_to_dict,
+        test_router_caches_found_agents,
+        test_router_fanout_returns_first_hit,
+        test_list_registries_reports_failing_adapter_as_unknown,
+        test_agntcy_translate_classifies_locators,
+        test_pull_batcher_coalesces_concurrent_pulls,
     ]
     
     passed = 0